@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Service Load Benchmark
+Drives the prediction endpoint of one of the demo services at a fixed
+concurrency (closed loop) or request rate (open loop) and reports
+throughput and tail latency from an HDR-style histogram
+"""
+import argparse
+import http.client
+import io
+import itertools
+import json
+import os
+import platform
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+# Where each service listens by default and how it wants its rows wrapped
+TARGETS = {
+    'flask_ml_service': {
+        'url': 'http://localhost:5002',
+        'path': '/predict',
+        'health': ('GET', '/health'),
+        'body': lambda rows: {"data": rows},
+        'formats': ('json', 'npy')
+    },
+    'ml_service': {
+        'url': 'http://localhost:3000',
+        'path': '/predict',
+        'health': ('GET', '/readyz'),
+        'body': lambda rows: {"data": rows},
+        'formats': ('json',)
+    },
+    'demo_bentoml_service': {
+        'url': 'http://localhost:5000',
+        'path': '/predict',
+        'health': ('GET', '/readyz'),
+        'body': lambda rows: {"input_data": {"data": rows}},
+        'formats': ('json',)
+    },
+    'demo_service': {
+        'url': 'http://localhost:5000',
+        'path': '/predict',
+        'health': ('GET', '/health'),
+        'body': lambda rows: {"data": rows},
+        'formats': ('json',)
+    }
+}
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LatencyHistogram:
+    """Latencies in microseconds, bucketed log-linearly like HdrHistogram.
+
+    Each power of two is split into 2**SUB_BUCKET_BITS / 2 linear buckets, so
+    every recorded value is exact to within 1/64 (about 1.6%) at any scale.
+    Histograms from different threads or runs merge by adding counts.
+    """
+
+    SUB_BUCKET_BITS = 7
+
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = 0
+
+    @classmethod
+    def bucket(cls, value):
+        shift = max(value.bit_length() - cls.SUB_BUCKET_BITS, 0)
+        return (shift << (cls.SUB_BUCKET_BITS - 1)) + (value >> shift)
+
+    @classmethod
+    def bucket_value(cls, index):
+        """Highest value that falls in a bucket"""
+        half = 1 << (cls.SUB_BUCKET_BITS - 1)
+        if index < 2 * half:
+            return index
+        shift = (index >> (cls.SUB_BUCKET_BITS - 1)) - 1
+        sub = index - (shift << (cls.SUB_BUCKET_BITS - 1))
+        return ((sub + 1) << shift) - 1
+
+    def record(self, micros):
+        micros = max(int(micros), 0)
+        index = self.bucket(micros)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+        self.sum += micros
+        self.min = micros if self.min is None else min(self.min, micros)
+        self.max = max(self.max, micros)
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p):
+        if not self.total:
+            return 0
+        rank = max(1, int(np.ceil(p / 100 * self.total)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self.bucket_value(index), self.max)
+        return self.max
+
+    def summary_ms(self):
+        """min/mean/percentiles/max in milliseconds"""
+        summary = {'min': (self.min or 0) / 1000,
+                   'mean': self.sum / self.total / 1000 if self.total else 0.0}
+        for p in PERCENTILES:
+            summary[f"p{p:g}"] = self.percentile(p) / 1000
+        summary['max'] = self.max / 1000
+        return summary
+
+    def to_json(self):
+        """Sparse [bucket upper bound in us, count] pairs"""
+        return [[self.bucket_value(index), self.counts[index]] for index in sorted(self.counts)]
+
+    @classmethod
+    def from_json(cls, pairs):
+        histogram = cls()
+        for value, count in pairs:
+            histogram.counts[cls.bucket(value)] = count
+            histogram.total += count
+            histogram.sum += value * count
+            histogram.min = value if histogram.min is None else min(histogram.min, value)
+            histogram.max = max(histogram.max, value)
+        return histogram
+
+
+def build_payloads(target, rows, features, count, kind='json', seed=0):
+    """Pre-encoded (body, content type) variants, so encoding stays out of the timing.
+
+    Several distinct payloads keep result caches from answering every request.
+    """
+    rng = np.random.default_rng(seed)
+    payloads = []
+    for _ in range(count):
+        data = rng.normal(size=(rows, features))
+        if kind == 'npy':
+            buffer = io.BytesIO()
+            np.save(buffer, data, allow_pickle=False)
+            payloads.append((buffer.getvalue(), 'application/x-npy'))
+        else:
+            payloads.append((json.dumps(target['body'](data.tolist())).encode(), 'application/json'))
+    return payloads
+
+
+class Worker(threading.Thread):
+    """One keep-alive connection issuing requests in a loop"""
+
+    def __init__(self, url, path, payloads, schedule, deadline, timeout):
+        super().__init__(daemon=True)
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.path = (parts.path.rstrip('/') + path) or '/'
+        self.payloads = payloads
+        self.schedule = schedule
+        self.deadline = deadline
+        self.timeout = timeout
+        self.histogram = LatencyHistogram()
+        self.statuses = {}
+        self.errors = {}
+        self.connection = None
+
+    def send(self, body, content_type):
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        self.connection.request('POST', self.path, body=body,
+                                headers={'Content-Type': content_type, 'Accept': 'application/json'})
+        response = self.connection.getresponse()
+        response.read()
+        if response.getheader('Connection', '').lower() == 'close':
+            self.reconnect()
+        return response.status
+
+    def reconnect(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def run(self):
+        payloads = itertools.cycle(self.payloads)
+        while True:
+            intended = self.schedule()
+            if intended is None or intended >= self.deadline:
+                break
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            body, content_type = next(payloads)
+            try:
+                status = self.send(body, content_type)
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+            except (OSError, http.client.HTTPException) as e:
+                name = type(e).__name__
+                self.errors[name] = self.errors.get(name, 0) + 1
+                self.reconnect()
+                continue
+            # Open loop: time from when the request should have gone out, so a
+            # stalled server is not hidden by the client backing off
+            self.histogram.record((time.perf_counter() - intended) * 1e6)
+        self.reconnect()
+
+
+def closed_loop_schedule():
+    return time.perf_counter
+
+
+def open_loop_schedule(rate, start):
+    """Send times spaced 1/rate apart from start, shared by all workers"""
+    counter = itertools.count()
+    lock = threading.Lock()
+
+    def next_send():
+        with lock:
+            i = next(counter)
+        return start + i / rate
+    return next_send
+
+
+def run_benchmark(url, path, payloads, concurrency=8, duration=10.0, rate=None, warmup=0.0, timeout=30.0):
+    """Load the endpoint and return (histogram, statuses, errors, elapsed seconds)"""
+    if warmup > 0:
+        run_benchmark(url, path, payloads, concurrency, warmup, rate, 0.0, timeout)
+
+    start = time.perf_counter()
+    deadline = start + duration
+    schedule = open_loop_schedule(rate, start) if rate else closed_loop_schedule()
+    workers = [Worker(url, path, payloads, schedule, deadline, timeout) for _ in range(concurrency)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    histogram = LatencyHistogram()
+    statuses, errors = {}, {}
+    for worker in workers:
+        histogram.merge(worker.histogram)
+        for status, count in worker.statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+        for name, count in worker.errors.items():
+            errors[name] = errors.get(name, 0) + count
+    return histogram, statuses, errors, elapsed
+
+
+def check_health(url, target, timeout=5.0):
+    """Status code of the target's health endpoint, or None if it cannot be reached"""
+    method, path = target['health']
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+    try:
+        connection.request(method, parts.path.rstrip('/') + path)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    except OSError:
+        return None
+    finally:
+        connection.close()
+
+
+def build_result(args, url, histogram, statuses, errors, elapsed):
+    completed = histogram.total
+    ok = sum(count for status, count in statuses.items() if 200 <= status < 300)
+    return {
+        'target': args.target,
+        'url': url,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'host': platform.node(),
+        'config': {
+            'concurrency': args.concurrency,
+            'rate': args.rate,
+            'mode': 'open' if args.rate else 'closed',
+            'duration': args.duration,
+            'warmup': args.warmup,
+            'rows': args.rows,
+            'features': args.features,
+            'format': args.format,
+            'payloads': args.payloads
+        },
+        'elapsed': elapsed,
+        'requests': completed,
+        'ok': ok,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'errors': errors,
+        'throughput_rps': completed / elapsed if elapsed else 0.0,
+        'rows_per_second': ok * args.rows / elapsed if elapsed else 0.0,
+        'latency_ms': histogram.summary_ms(),
+        'histogram_us': histogram.to_json()
+    }
+
+
+def print_result(result, baseline=None):
+    print(f"{result['target']} {result['url']}  {result['config']['mode']} loop, "
+          f"{result['config']['concurrency']} connections, {result['config']['rows']}x{result['config']['features']} rows")
+    print(f"  requests {result['requests']}  ok {result['ok']}  errors {sum(result['errors'].values())}  "
+          f"statuses {result['statuses']}")
+
+    def line(label, key, value, unit, lower_is_better):
+        text = f"  {label:<12}{value:12.2f} {unit}"
+        if baseline is not None:
+            before = baseline[key] if key in baseline else baseline['latency_ms'].get(label)
+            if before:
+                change = (value - before) / before * 100
+                better = change < 0 if lower_is_better else change > 0
+                text += f"   {'+' if change >= 0 else ''}{change:.1f}% vs baseline ({before:.2f})" + \
+                        ('' if abs(change) < 1 else ' better' if better else ' worse')
+        print(text)
+
+    line('throughput', 'throughput_rps', result['throughput_rps'], 'req/s', False)
+    line('rows/s', 'rows_per_second', result['rows_per_second'], 'rows/s', False)
+    for label, value in result['latency_ms'].items():
+        line(label, None, value, 'ms', True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test a demo prediction service")
+    parser.add_argument('target', choices=sorted(TARGETS))
+    parser.add_argument('--url', help="Base URL (default depends on the target)")
+    parser.add_argument('--path', help="Endpoint path (default /predict)")
+    parser.add_argument('-c', '--concurrency', type=int, default=8, help="Connections (default 8)")
+    parser.add_argument('-r', '--rate', type=float,
+                        help="Requests per second across all connections (open loop); "
+                             "without it every connection sends as fast as it gets answers")
+    parser.add_argument('-d', '--duration', type=float, default=10.0, help="Seconds to measure (default 10)")
+    parser.add_argument('--warmup', type=float, default=2.0, help="Unmeasured seconds first (default 2)")
+    parser.add_argument('--rows', type=int, default=1, help="Rows per request (batch size, default 1)")
+    parser.add_argument('--features', type=int, default=5, help="Values per row (default 5)")
+    parser.add_argument('--format', choices=('json', 'npy'), default='json')
+    parser.add_argument('--payloads', type=int, default=100,
+                        help="Distinct request bodies to cycle through (default 100)")
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('-o', '--output', help="Save results as JSON")
+    parser.add_argument('--compare', help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    target = TARGETS[args.target]
+    if args.format not in target['formats']:
+        parser.error(f"{args.target} accepts {', '.join(target['formats'])}")
+    url = (args.url or os.environ.get('BENCHMARK_URL') or target['url']).rstrip('/')
+
+    status = check_health(url, target)
+    if status is None:
+        parser.exit(1, f"{args.target} is not reachable at {url}\n")
+
+    payloads = build_payloads(target, args.rows, args.features, args.payloads, args.format)
+    histogram, statuses, errors, elapsed = run_benchmark(
+        url, args.path or target['path'], payloads, concurrency=args.concurrency, duration=args.duration,
+        rate=args.rate, warmup=args.warmup, timeout=args.timeout)
+
+    result = build_result(args, url, histogram, statuses, errors, elapsed)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_result(result, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
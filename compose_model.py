@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Compose File Model Cache
+Parses docker-compose*.yml files once with a real YAML parser and re-parses
+only when a file's mtime, inode or size changes
+"""
+import os
+import threading
+from dataclasses import dataclass, field
+
+import yaml
+
+# The C loader is several times faster when libyaml is available
+YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+@dataclass
+class ComposeService:
+    """One service entry of a compose file"""
+    name: str
+    image: str = ''
+    container_name: str = ''
+    ports: list = field(default_factory=list)
+    healthcheck: dict = None
+    depends_on: list = field(default_factory=list)
+
+
+@dataclass
+class ComposeFile:
+    """A parsed compose file; error is set if it could not be parsed"""
+    file_name: str
+    services: dict = field(default_factory=dict)
+    error: str = ''
+
+    @property
+    def project_name(self):
+        """Short name used in the GUI, e.g. 'n8n' for docker-compose.n8n.yml"""
+        return self.file_name.replace('docker-compose.', '').replace('.yml', '')
+
+
+def is_compose_file(file_name):
+    return file_name.startswith('docker-compose') and file_name.endswith('.yml')
+
+
+def format_port(port):
+    """Render a short or long syntax port mapping as `published:target`"""
+    if isinstance(port, dict):
+        target = port.get('target', '')
+        published = port.get('published')
+        return f"{published}:{target}" if published else str(target)
+    return str(port)
+
+
+def parse_service(name, definition):
+    """Build a ComposeService from its YAML mapping"""
+    definition = definition or {}
+    depends_on = definition.get('depends_on') or []
+    if isinstance(depends_on, dict):
+        depends_on = list(depends_on)
+    return ComposeService(
+        name=name,
+        image=definition.get('image', ''),
+        container_name=definition.get('container_name', ''),
+        ports=[format_port(p) for p in definition.get('ports') or []],
+        healthcheck=definition.get('healthcheck'),
+        depends_on=list(depends_on)
+    )
+
+
+def parse_compose_file(path):
+    """Parse a compose file from disk"""
+    file_name = os.path.basename(path)
+    try:
+        with open(path, 'r') as f:
+            document = yaml.load(f, Loader=YamlLoader) or {}
+        services = document.get('services') or {}
+        return ComposeFile(file_name, {name: parse_service(name, definition)
+                                       for name, definition in services.items()})
+    except (OSError, yaml.YAMLError, AttributeError) as e:
+        return ComposeFile(file_name, error=str(e))
+
+
+class ComposeModelCache:
+    """Thread-safe cache of parsed compose files in one directory"""
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self.lock = threading.Lock()
+        self.files = {}
+        self.listing = None
+        self.listing_key = None
+
+    @staticmethod
+    def _stat_key(path):
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_ino, st.st_size)
+
+    def list_files(self):
+        """Sorted compose file names; the directory is re-listed only when it changes"""
+        key = self._stat_key(self.base_dir)
+        with self.lock:
+            if self.listing is None or key != self.listing_key:
+                self.listing = sorted(f for f in os.listdir(self.base_dir) if is_compose_file(f))
+                self.listing_key = key
+            return list(self.listing)
+
+    def get(self, file_name):
+        """Parsed model of a compose file, re-parsed only if it changed on disk"""
+        path = os.path.join(self.base_dir, file_name)
+        try:
+            key = self._stat_key(path)
+        except OSError as e:
+            return ComposeFile(file_name, error=str(e))
+
+        with self.lock:
+            cached = self.files.get(file_name)
+            if cached and cached[0] == key:
+                return cached[1]
+
+        model = parse_compose_file(path)
+        with self.lock:
+            self.files[file_name] = (key, model)
+        return model
+
+    def invalidate(self, file_name=None):
+        """Forget one file (or everything), e.g. when a watcher reports a change"""
+        with self.lock:
+            if file_name is None:
+                self.files.clear()
+                self.listing = None
+            else:
+                self.files.pop(file_name, None)
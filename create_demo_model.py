@@ -1,21 +1,54 @@
-import bentoml
-from bentoml.io import JSON
+import argparse
+
 import numpy as np
+from sklearn.ensemble import RandomForestClassifier
 
-# Create a simple BentoML service
-@bentoml.service()
-class DemoService:
+from flat_forest import FlatForest
+from model_artifact import MODEL_NAME, MODEL_VERSION, model_path, save_model
 
-    @bentoml.api
-    def predict(self, input_data: JSON) -> JSON:
-        """Simple prediction service for demo purposes"""
-        return {"result": "Hello from BentoML!", "input": input_data}
 
-# Save the service to create a bento
-if __name__ == "__main__":
+def train_demo_model(n_samples=100, n_features=5, seed=42):
+    """Fit the demo random forest on fixed synthetic data, so every build gets the same model"""
+    rng = np.random.RandomState(seed)
+    model = RandomForestClassifier(n_estimators=100, random_state=seed)
+    model.fit(rng.randn(n_samples, n_features), rng.randint(0, 2, n_samples))
+    return model
+
+
+def build_bento():
+    """Build the demo bento; BentoML is only needed for this step"""
+    import bentoml
+    from bentoml.io import JSON
+
+    # Create a simple BentoML service
+    @bentoml.service()
+    class DemoService:
+
+        @bentoml.api
+        def predict(self, input_data: JSON) -> JSON:
+            """Simple prediction service for demo purposes"""
+            return {"result": "Hello from BentoML!", "input": input_data}
+
     # Create a simple bento for serving
     bentoml.build(
         "demo_service:latest",
         labels={"demo": "true"},
         description="Demo BentoML service"
     )
+
+
+# Train and save the model artifact, optionally building the bento as well
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the demo model and save it as a versioned artifact")
+    parser.add_argument('--output', default=model_path(), help="artifact path")
+    parser.add_argument('--bento', action='store_true', help="also build the demo bento")
+    args = parser.parse_args()
+
+    model = train_demo_model()
+    # The flattened copy is stored too, so services can memory-map its arrays
+    path = save_model(model, args.output, name=MODEL_NAME, version=MODEL_VERSION, n_features=5,
+                      flat_forest=FlatForest.from_sklearn(model))
+    print(f"Saved {MODEL_NAME} v{MODEL_VERSION} to {path}")
+
+    if args.bento:
+        build_bento()
@@ -1,57 +1,269 @@
+from concurrent.futures import ThreadPoolExecutor
 from http.server import HTTPServer, BaseHTTPRequestHandler
 import json
 import os
+import select
+import sys
+import threading
+import time
+
+from service_metrics import CONTENT_TYPE, ROW_BUCKETS, Counter, Gauge, Histogram, MetricsRegistry, StageTimer
+
+# Connections served at once; each keep-alive connection holds a worker until it goes idle
+WORKERS = int(os.environ.get('DEMO_WORKERS', 32))
+# Idle keep-alive connections are closed after this many seconds, freeing their worker,
+# or after SATURATED_KEEPALIVE_TIMEOUT when every worker is busy and another client is waiting
+KEEPALIVE_TIMEOUT = float(os.environ.get('DEMO_KEEPALIVE_TIMEOUT', 5))
+SATURATED_KEEPALIVE_TIMEOUT = float(os.environ.get('DEMO_SATURATED_KEEPALIVE_TIMEOUT', 0.1))
+IDLE_POLL_SECONDS = 0.02
+# Pending connections the kernel queues while all workers are busy
+BACKLOG = int(os.environ.get('DEMO_BACKLOG', 128))
+MAX_BODY_BYTES = int(os.environ.get('DEMO_MAX_BODY_BYTES', 10 * 1024 * 1024))
+
+# Prometheus metrics, served on /metrics; other paths are counted together as 'other'.
+# A registry of its own (single process, no METRICS_DIR), so the metric names can be
+# shared with flask_ml_service when both are imported, e.g. by microbench.py
+METRICS = MetricsRegistry()
+ENDPOINTS = ('/', '/health', '/predict', '/metrics')
+REQUESTS = Counter('http_requests_total', "HTTP requests handled", ('endpoint', 'method', 'status'),
+                   registry=METRICS)
+IN_FLIGHT = Gauge('http_requests_in_flight', "HTTP requests being handled", ('endpoint',), registry=METRICS)
+REQUEST_SECONDS = Histogram('http_request_duration_seconds', "Time to handle an HTTP request", ('endpoint',),
+                            registry=METRICS)
+STAGE_SECONDS = Histogram('prediction_stage_seconds', "Time per prediction stage: read, parse, serialize",
+                          ('endpoint', 'stage'), registry=METRICS)
+REQUEST_ROWS = Histogram('prediction_request_rows', "Rows per prediction request", ('endpoint',),
+                         registry=METRICS, buckets=ROW_BUCKETS)
+
+
+class BoundedThreadingHTTPServer(HTTPServer):
+    """HTTPServer handing connections to a fixed pool of threads.
+
+    While every worker is busy the accept loop blocks, so further
+    connections wait in the kernel backlog rather than in memory.
+    """
+
+    daemon_threads = True
+    request_queue_size = BACKLOG
+
+    def __init__(self, server_address, handler_class, workers=WORKERS):
+        self.workers = workers
+        self.slots = threading.BoundedSemaphore(workers)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.waiting = 0  # accepted connections blocked on a free slot
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='demo-http')
+        super().__init__(server_address, handler_class)
+
+    def process_request(self, request, client_address):
+        with self.lock:
+            self.waiting += 1
+        self.slots.acquire()
+        with self.lock:
+            self.waiting -= 1
+            self.active += 1
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            with self.lock:
+                self.active -= 1
+            self.slots.release()
+
+    def saturated(self):
+        return self.active >= self.workers
+
+    def wait_for_request(self, connection, timeout):
+        """True once the next request arrives on a keep-alive connection.
+
+        False after timeout, or once the connection has been idle for
+        SATURATED_KEEPALIVE_TIMEOUT while the pool is full and another client
+        is waiting: one already accepted and blocked on a slot, or one still
+        in the listen backlog. The idle connection then gives up its worker.
+        """
+        now = time.monotonic()
+        deadline = now + timeout
+        grace = now + SATURATED_KEEPALIVE_TIMEOUT
+        while now < deadline:
+            watched = [connection]
+            if now >= grace and self.saturated():
+                if self.waiting:
+                    return False
+                watched.append(self.socket)
+            readable, _, _ = select.select(watched, [], [], min(deadline - now, max(grace - now, IDLE_POLL_SECONDS)))
+            if connection in readable:
+                return True
+            if self.socket in readable:
+                return False
+            now = time.monotonic()
+        return False
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up or going quiet mid-request are routine under load
+        if not isinstance(sys.exc_info()[1], (ConnectionError, TimeoutError)):
+            super().handle_error(request, client_address)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
+
+
+def json_payload(response):
+    """Encoded JSON body and its Content-Length value"""
+    body = json.dumps(response).encode()
+    return body, str(len(body))
+
+
+# Bodies that never change are encoded once, not on every request
+STATIC_RESPONSES = {
+    '/': json_payload({
+        "message": "BentoML Demo Service",
+        "status": "running",
+        "endpoints": {
+            "predict": "POST /predict",
+            "health": "GET /health",
+            "metrics": "GET /metrics"
+        }
+    }),
+    '/health': json_payload({"status": "healthy"})
+}
+NOT_FOUND = json_payload({"error": "Not found"})
+METHOD_NOT_ALLOWED = json_payload({"error": "Method not allowed"})
+INVALID_JSON = json_payload({
+    "error": "Invalid JSON input",
+    "example": {"data": [1, 2, 3, 4]}
+})
+LENGTH_REQUIRED = json_payload({"error": "Content-Length required"})
+TOO_LARGE = json_payload({"error": f"Request body over {MAX_BODY_BYTES} bytes"})
+
+
+def count_rows(document):
+    """Rows in a {"data": [...]} input: one for a flat list, else one per item"""
+    data = document.get('data') if isinstance(document, dict) else document
+    if isinstance(data, list) and data and isinstance(data[0], list):
+        return len(data)
+    return 1
+
 
 class DemoHandler(BaseHTTPRequestHandler):
+    # Keep connections open between requests; every response carries Content-Length
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEPALIVE_TIMEOUT
+    # Buffer headers and body into one write (flushed after each request) and send it
+    # at once; separate small writes stall on delayed ACKs for ~40 ms per response
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection and self.next_request_ready():
+            self.handle_one_request()
+
+    def next_request_ready(self):
+        # A pipelined request may already sit in the read buffer, where select() cannot see it
+        self.connection.setblocking(False)
+        try:
+            if self.rfile.peek(1):
+                return True
+        except BlockingIOError:
+            pass
+        finally:
+            self.connection.settimeout(self.timeout)
+        return self.server.wait_for_request(self.connection, self.timeout)
+
+    def send_payload(self, status, payload, content_type='application/json', **headers):
+        body, length = payload
+        REQUESTS.labels(self.metrics_endpoint, self.command, status).inc()
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', length)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
     def do_GET(self):
-        if self.path == '/':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            response = {
-                "message": "BentoML Demo Service",
-                "status": "running",
-                "endpoints": {
-                    "predict": "POST /predict",
-                    "health": "GET /health"
-                }
-            }
-            self.wfile.write(json.dumps(response).encode())
-        elif self.path == '/health':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(json.dumps({"status": "healthy"}).encode())
-        else:
-            self.send_response(404)
-            self.end_headers()
+        self.tracked(self.get)
 
     def do_POST(self):
-        if self.path == '/predict':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-
-            content_length = int(self.headers.get('Content-Length', 0))
-            post_data = self.rfile.read(content_length)
-
-            try:
-                input_data = json.loads(post_data.decode('utf-8'))
-                response = {
-                    "prediction": "Demo prediction result",
-                    "input": input_data,
-                    "model": "demo_model_v1.0"
-                }
-            except:
-                response = {
-                    "error": "Invalid JSON input",
-                    "example": {"data": [1, 2, 3, 4]}
-                }
-
-            self.wfile.write(json.dumps(response).encode())
+        self.tracked(self.post)
+
+    def tracked(self, handler):
+        """Run a method handler, counting it in flight and timing it"""
+        self.metrics_endpoint = self.path if self.path in ENDPOINTS else 'other'
+        in_flight = IN_FLIGHT.labels(self.metrics_endpoint)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            handler()
+        finally:
+            in_flight.dec()
+            REQUEST_SECONDS.labels(self.metrics_endpoint).observe(time.perf_counter() - started)
+
+    def get(self):
+        payload = STATIC_RESPONSES.get(self.path)
+        if payload is not None:
+            self.send_payload(200, payload)
+        elif self.path == '/metrics':
+            body = METRICS.render()
+            self.send_payload(200, (body, str(len(body))), content_type=CONTENT_TYPE)
+        elif self.path == '/predict':
+            self.send_payload(405, METHOD_NOT_ALLOWED, Allow='POST')
         else:
-            self.send_response(404)
-            self.end_headers()
+            self.send_payload(404, NOT_FOUND)
+
+    def read_body(self):
+        """Request body, or None after answering with an error status"""
+        try:
+            content_length = int(self.headers['Content-Length'])
+            if content_length < 0:
+                raise ValueError(content_length)
+        except (TypeError, ValueError):
+            self.send_payload(411, LENGTH_REQUIRED, Connection='close')
+            return None
+        if content_length > MAX_BODY_BYTES:
+            # The body is left unread, so the connection cannot be reused
+            self.send_payload(413, TOO_LARGE, Connection='close')
+            return None
+        return self.rfile.read(content_length)
+
+    def post(self):
+        timer = StageTimer(STAGE_SECONDS, 'predict')
+        # Read the body even when it is not used, so the next request on the connection starts cleanly
+        post_data = self.read_body()
+        if post_data is None:
+            return
+
+        if self.path != '/predict':
+            if self.path in STATIC_RESPONSES:
+                self.send_payload(405, METHOD_NOT_ALLOWED, Allow='GET')
+            else:
+                self.send_payload(404, NOT_FOUND)
+            return
+
+        timer.mark('read')
+        try:
+            input_data = json.loads(post_data)
+        except ValueError:
+            self.send_payload(400, INVALID_JSON)
+            return
+        timer.mark('parse')
+        REQUEST_ROWS.labels('predict').observe(count_rows(input_data))
+
+        # Nothing is sent until the input is known to be good
+        payload = json_payload({
+            "prediction": "Demo prediction result",
+            "input": input_data,
+            "model": "demo_model_v1.0"
+        })
+        timer.mark('serialize')
+        self.send_payload(200, payload)
 
     def log_message(self, format, *args):
         # Suppress default logging
@@ -59,6 +271,11 @@ class DemoHandler(BaseHTTPRequestHandler):
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    server = HTTPServer(('0.0.0.0', port), DemoHandler)
-    print(f"Demo BentoML service running on port {port}")
-    server.serve_forever()
+    server = BoundedThreadingHTTPServer(('0.0.0.0', port), DemoHandler)
+    print(f"Demo BentoML service running on port {port} ({WORKERS} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Docker Engine API Client
+Talks to the daemon over its unix socket with pooled keep-alive connections,
+so status queries skip the 30-80 ms startup cost of the `docker` CLI
+"""
+import http.client
+import json
+import os
+import queue
+import socket
+import struct
+from dataclasses import dataclass, field
+from urllib.parse import quote, urlencode
+
+DEFAULT_SOCKET = '/var/run/docker.sock'
+
+COMPOSE_PROJECT_LABEL = 'com.docker.compose.project'
+COMPOSE_SERVICE_LABEL = 'com.docker.compose.service'
+COMPOSE_CONFIG_FILES_LABEL = 'com.docker.compose.project.config_files'
+COMPOSE_WORKING_DIR_LABEL = 'com.docker.compose.project.working_dir'
+
+
+class DockerEngineError(Exception):
+    """Raised when the Engine API answers with an error status"""
+
+    def __init__(self, status, message):
+        super().__init__(f"Docker API error {status}: {message}")
+        self.status = status
+        self.message = message
+
+
+@dataclass
+class Container:
+    """One container, as shown by `docker ps -a`"""
+    id: str
+    name: str
+    image: str
+    state: str
+    status: str
+    ports: str = ''
+    labels: dict = field(default_factory=dict)
+
+    @property
+    def compose_project(self):
+        return self.labels.get(COMPOSE_PROJECT_LABEL, '')
+
+    @property
+    def compose_service(self):
+        return self.labels.get(COMPOSE_SERVICE_LABEL, '')
+
+    @property
+    def compose_files(self):
+        """Base names of the compose files this container was created from"""
+        config_files = self.labels.get(COMPOSE_CONFIG_FILES_LABEL, '')
+        return [os.path.basename(p) for p in config_files.split(',') if p]
+
+    @property
+    def running(self):
+        return self.state == 'running'
+
+
+@dataclass
+class Network:
+    """One Docker network"""
+    id: str
+    name: str
+    driver: str
+    scope: str
+    labels: dict = field(default_factory=dict)
+
+
+@dataclass
+class ComposeProject:
+    """Containers grouped by their compose project label"""
+    name: str
+    working_dir: str = ''
+    config_files: list = field(default_factory=list)
+    containers: list = field(default_factory=list)
+
+    @property
+    def running_count(self):
+        return sum(1 for c in self.containers if c.running)
+
+
+def format_ports(ports):
+    """Render the Engine API port list the way `docker ps` does"""
+    rendered = []
+    for port in sorted(ports or [], key=lambda p: (p.get('PrivatePort', 0), p.get('IP', ''))):
+        private = f"{port.get('PrivatePort')}/{port.get('Type', 'tcp')}"
+        if port.get('PublicPort'):
+            rendered.append(f"{port.get('IP', '0.0.0.0')}:{port['PublicPort']}->{private}")
+        else:
+            rendered.append(private)
+    return ', '.join(dict.fromkeys(rendered))
+
+
+def container_from_api(entry):
+    """Build a Container from one `/containers/json` object"""
+    names = entry.get('Names') or ['']
+    return Container(
+        id=entry.get('Id', ''),
+        name=names[0].lstrip('/'),
+        image=entry.get('Image', ''),
+        state=entry.get('State', ''),
+        status=entry.get('Status', ''),
+        ports=format_ports(entry.get('Ports')),
+        labels=entry.get('Labels') or {}
+    )
+
+
+def group_compose_projects(containers):
+    """Group containers into ComposeProject records by their project label"""
+    projects = {}
+    for container in containers:
+        name = container.compose_project
+        if not name:
+            continue
+        project = projects.get(name)
+        if project is None:
+            project = projects[name] = ComposeProject(
+                name=name, working_dir=container.labels.get(COMPOSE_WORKING_DIR_LABEL, ''))
+        for compose_file in container.compose_files:
+            if compose_file not in project.config_files:
+                project.config_files.append(compose_file)
+        project.containers.append(container)
+    return sorted(projects.values(), key=lambda p: p.name)
+
+
+def socket_path_from_env():
+    """Resolve the daemon socket from DOCKER_HOST, or None if it is not a unix socket"""
+    docker_host = os.environ.get('DOCKER_HOST', '')
+    if docker_host.startswith('unix://'):
+        return docker_host[len('unix://'):]
+    if docker_host:
+        return None
+    return DEFAULT_SOCKET
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP/1.1 connection over a unix domain socket"""
+
+    def __init__(self, socket_path, timeout=10):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class EngineEventStream:
+    """Iterator over `/events` objects on a dedicated connection"""
+
+    def __init__(self, connection, response):
+        self.connection = connection
+        self.response = response
+
+    def __iter__(self):
+        while True:
+            line = self.response.readline()
+            if not line:
+                return
+            if line.strip():
+                yield json.loads(line)
+
+    def close(self):
+        """Close the stream; unblocks a thread waiting in __iter__"""
+        try:
+            if self.connection.sock:
+                self.connection.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.connection.close()
+
+
+class EngineLogStream(EngineEventStream):
+    """Iterator over decoded log lines from `/containers/{id}/logs`"""
+
+    def __init__(self, connection, response, multiplexed):
+        super().__init__(connection, response)
+        self.multiplexed = multiplexed
+
+    def __iter__(self):
+        if not self.multiplexed:
+            # TTY containers send the raw stream
+            while True:
+                line = self.response.readline()
+                if not line:
+                    return
+                yield line.decode('utf-8', 'replace').rstrip('\r\n')
+
+        # Non-TTY containers send frames: 1 byte stream, 3 padding, 4 byte big-endian size
+        pending = {}
+        while True:
+            header = self.response.read(8)
+            if len(header) < 8:
+                break
+            stream, size = header[0], struct.unpack('>I', header[4:])[0]
+            data = pending.pop(stream, b'') + self.response.read(size)
+            *lines, rest = data.split(b'\n')
+            if rest:
+                pending[stream] = rest
+            for line in lines:
+                yield line.decode('utf-8', 'replace').rstrip('\r')
+
+        for rest in pending.values():
+            yield rest.decode('utf-8', 'replace').rstrip('\r')
+
+
+class DockerEngineClient:
+    """Minimal Engine API client with a small pool of keep-alive connections"""
+
+    def __init__(self, socket_path=None, timeout=10, pool_size=4):
+        self.socket_path = socket_path or socket_path_from_env()
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self._api_prefix = None
+
+    @classmethod
+    def available(cls, socket_path=None):
+        """Check whether a unix socket client can be used on this host"""
+        socket_path = socket_path or socket_path_from_env()
+        return bool(hasattr(socket, 'AF_UNIX') and socket_path and os.path.exists(socket_path))
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return UnixHTTPConnection(self.socket_path, self.timeout)
+
+    def _release(self, connection):
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def api_prefix(self):
+        """'/v1.NN' for the API version the daemon speaks, asked once from `/version`.
+
+        Falls back to '' (unversioned paths, which the daemon serves at its
+        own version) when the answer has no ApiVersion.
+        """
+        if self._api_prefix is None:
+            version = (self._send('GET', '/version') or {}).get('ApiVersion')
+            self._api_prefix = f"/v{version}" if version else ''
+        return self._api_prefix
+
+    def url(self, path, params=None):
+        """Versioned request target for an API path"""
+        url = f"{self.api_prefix()}{path}"
+        if params:
+            url += '?' + urlencode(params)
+        return url
+
+    def request(self, method, path, params=None):
+        """Send one request and return the decoded JSON body"""
+        return self._send(method, self.url(path, params))
+
+    def _send(self, method, url):
+        connection = self._acquire()
+        try:
+            try:
+                connection.request(method, url)
+                response = connection.getresponse()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # The daemon closed an idle keep-alive connection; retry once on a fresh one
+                connection.close()
+                connection.request(method, url)
+                response = connection.getresponse()
+            body = response.read()
+        except Exception:
+            connection.close()
+            raise
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(connection)
+
+        if response.status >= 400:
+            try:
+                message = json.loads(body).get('message', '')
+            except ValueError:
+                message = body.decode('utf-8', 'replace')
+            raise DockerEngineError(response.status, message)
+        return json.loads(body) if body else None
+
+    def close(self):
+        """Close all idle pooled connections"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def ping(self):
+        """Check that the daemon answers"""
+        connection = self._acquire()
+        try:
+            connection.request('GET', '/_ping')
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            return False
+        self._release(connection)
+        return response.status == 200
+
+    def containers(self, all=True, filters=None):
+        """List containers as Container records"""
+        params = {'all': '1' if all else '0'}
+        if filters:
+            params['filters'] = json.dumps(filters)
+        return [container_from_api(c) for c in self.request('GET', '/containers/json', params)]
+
+    def container(self, container_id):
+        """Look up a single container by ID; None if it no longer exists"""
+        matches = self.containers(filters={'id': [container_id]})
+        return matches[0] if matches else None
+
+    def networks(self):
+        """List networks as Network records"""
+        return [Network(id=n.get('Id', ''), name=n.get('Name', ''), driver=n.get('Driver', ''),
+                        scope=n.get('Scope', ''), labels=n.get('Labels') or {})
+                for n in self.request('GET', '/networks')]
+
+    def compose_projects(self):
+        """List compose projects from a single container listing"""
+        return group_compose_projects(self.containers())
+
+    def events(self, filters=None):
+        """Open a streaming `/events` connection; the caller must close() it"""
+        params = {'filters': json.dumps(filters)} if filters else None
+        # No read timeout: the stream is idle until something happens
+        connection = UnixHTTPConnection(self.socket_path, timeout=None)
+        connection.request('GET', self.url('/events', params))
+        response = connection.getresponse()
+        if response.status >= 400:
+            message = response.read().decode('utf-8', 'replace')
+            connection.close()
+            raise DockerEngineError(response.status, message)
+        return EngineEventStream(connection, response)
+
+    def logs(self, container, follow=False, tail='all', timestamps=False, since=None):
+        """Open a log stream for a container (name or ID); the caller must close() it"""
+        path = f"/containers/{quote(container, safe='')}"
+        tty = (self.request('GET', path + '/json').get('Config') or {}).get('Tty', False)
+        params = {'stdout': '1', 'stderr': '1', 'follow': '1' if follow else '0',
+                  'tail': str(tail), 'timestamps': '1' if timestamps else '0'}
+        if since is not None:
+            params['since'] = f"{since:.6f}"
+        connection = UnixHTTPConnection(self.socket_path, timeout=None if follow else self.timeout)
+        connection.request('GET', self.url(path + '/logs', params))
+        response = connection.getresponse()
+        if response.status >= 400:
+            message = response.read().decode('utf-8', 'replace')
+            connection.close()
+            raise DockerEngineError(response.status, message)
+        return EngineLogStream(connection, response, multiplexed=not tty)
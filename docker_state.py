@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Docker Container State Store
+Shared in-memory view of all containers, kept current from the `docker events` stream.
+Uses the Engine API socket when available and the `docker` CLI otherwise.
+"""
+import http.client
+import json
+import os
+import subprocess
+import threading
+
+from docker_engine import Container, DockerEngineClient, DockerEngineError, group_compose_projects
+
+# Event actions that can change what we show for a container.
+# Everything else (exec_*, attach, resize, top, ...) is ignored.
+RELEVANT_ACTIONS = {
+    'create', 'start', 'restart', 'stop', 'die', 'kill', 'oom',
+    'pause', 'unpause', 'rename', 'update', 'health_status'
+}
+
+PS_FORMAT = '{{json .}}'
+
+
+def parse_labels(labels):
+    """Parse the comma separated `k=v` label string printed by `docker ps`"""
+    if isinstance(labels, dict):
+        return dict(labels)
+
+    parsed = {}
+    for pair in (labels or '').split(','):
+        if '=' in pair:
+            key, value = pair.split('=', 1)
+            parsed[key] = value
+        elif parsed and pair:
+            # Label values may themselves contain commas (e.g. compose config_files)
+            last_key = next(reversed(parsed))
+            parsed[last_key] += ',' + pair
+    return parsed
+
+
+def container_from_ps(entry):
+    """Build a Container from one `docker ps --format '{{json .}}'` object"""
+    status = entry.get('Status', '')
+    state = entry.get('State') or ('running' if status.startswith('Up') else 'exited')
+    ports = entry.get('Ports', '')
+    return Container(
+        id=entry.get('ID', ''),
+        name=entry.get('Names', '').split(',')[0],
+        image=entry.get('Image', ''),
+        state=state,
+        status=status,
+        ports=ports if ports and ports != '<no value>' else '',
+        labels=parse_labels(entry.get('Labels', ''))
+    )
+
+
+# Lazily created Engine API client; None when the socket is not usable
+_engine = None
+_engine_checked = False
+
+ENGINE_ERRORS = (OSError, http.client.HTTPException, DockerEngineError, ValueError)
+
+
+def get_engine():
+    """Return the shared Engine API client, or None to use the CLI"""
+    global _engine, _engine_checked
+    if not _engine_checked:
+        _engine_checked = True
+        if DockerEngineClient.available():
+            _engine = DockerEngineClient()
+    return _engine
+
+
+def list_containers(container_id=None, timeout=15):
+    """List containers, optionally restricted to one ID"""
+    engine = get_engine()
+    if engine:
+        try:
+            if container_id:
+                container = engine.container(container_id)
+                return [container] if container else []
+            return engine.containers()
+        except ENGINE_ERRORS as e:
+            print(f"Docker API unavailable, falling back to CLI: {e}")
+    return list_containers_cli(container_id, timeout)
+
+
+def list_containers_cli(container_id=None, timeout=15):
+    """List containers via the docker CLI, optionally restricted to one ID"""
+    cmd = ['docker', 'ps', '-a', '--no-trunc', '--format', PS_FORMAT]
+    if container_id:
+        cmd[3:3] = ['--filter', f'id={container_id}']
+
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or "docker ps failed")
+
+    return [container_from_ps(json.loads(line))
+            for line in result.stdout.splitlines() if line.strip()]
+
+
+class CliEventStream:
+    """Iterator over `docker events` objects read from the CLI"""
+
+    def __init__(self):
+        self.process = subprocess.Popen(['docker', 'events', '--filter', 'type=container',
+                                         '--format', PS_FORMAT],
+                                        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                        text=True, bufsize=1)
+
+    def __iter__(self):
+        for line in self.process.stdout:
+            if line.strip():
+                yield json.loads(line)
+
+    def close(self):
+        """Terminate the `docker events` process if it is still running"""
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+def open_event_stream():
+    """Subscribe to container events; the result is iterable and has close()"""
+    engine = get_engine()
+    if engine:
+        try:
+            return engine.events(filters={'type': ['container']})
+        except ENGINE_ERRORS as e:
+            print(f"Docker API unavailable, falling back to CLI: {e}")
+    return CliEventStream()
+
+
+class CliLogStream(CliEventStream):
+    """Iterator over log lines read from `docker logs`"""
+
+    def __init__(self, container, follow=False, tail='all', timestamps=False, since=None):
+        cmd = ['docker', 'logs', '--tail', str(tail)]
+        if follow:
+            cmd.append('--follow')
+        if timestamps:
+            cmd.append('--timestamps')
+        if since is not None:
+            cmd += ['--since', f"{since:.6f}"]
+        self.process = subprocess.Popen(cmd + [container], stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT, text=True,
+                                        errors='replace', bufsize=1)
+
+    def __iter__(self):
+        for line in self.process.stdout:
+            yield line.rstrip('\r\n')
+
+
+def open_log_stream(container, follow=False, tail='all', timestamps=False, since=None):
+    """Stream a container's stdout/stderr line by line; the result has close()"""
+    engine = get_engine()
+    if engine:
+        try:
+            return engine.logs(container, follow=follow, tail=tail, timestamps=timestamps, since=since)
+        except ENGINE_ERRORS as e:
+            print(f"Docker API unavailable, falling back to CLI: {e}")
+    return CliLogStream(container, follow=follow, tail=tail, timestamps=timestamps, since=since)
+
+
+class ContainerStateStore:
+    """Thread-safe container table shared by every view.
+
+    The monitor thread is the only writer; views take snapshots.
+    `version` increases on every change so readers can skip redundant work.
+    Records are docker_engine.Container objects.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._containers = {}
+        self.connected = False
+        self.last_error = ""
+        self.version = 0
+
+    def resync(self, containers):
+        """Replace the whole table with a fresh full listing"""
+        with self._lock:
+            self._containers = {c.id: c for c in containers}
+            self.connected = True
+            self.last_error = ""
+            self.version += 1
+
+    def upsert(self, container):
+        """Insert or replace a single container record"""
+        with self._lock:
+            if self._containers.get(container.id) == container:
+                return False
+            self._containers[container.id] = container
+            self.version += 1
+            return True
+
+    def remove(self, container_id):
+        """Drop a container record; returns True if it was present"""
+        with self._lock:
+            if self._containers.pop(container_id, None) is None:
+                return False
+            self.version += 1
+            return True
+
+    def set_disconnected(self, error=""):
+        """Mark the daemon unreachable; the last known table is kept"""
+        with self._lock:
+            if not self.connected and self.last_error == error:
+                return False
+            self.connected = False
+            self.last_error = error
+            self.version += 1
+            return True
+
+    def get(self, container_id):
+        """Return one container record, or None if it is unknown"""
+        with self._lock:
+            return self._containers.get(container_id)
+
+    def snapshot(self):
+        """Return a list of container records sorted by name"""
+        with self._lock:
+            containers = list(self._containers.values())
+        return sorted(containers, key=lambda c: c.name)
+
+    def apply_event(self, event, fetch=list_containers):
+        """Apply one `docker events` object; returns True if the table changed.
+
+        Only the container named by the event is re-read, so each event
+        costs at most one lookup regardless of how many containers exist.
+        """
+        action = (event.get('Action') or event.get('status') or '').split(':')[0]
+        container_id = event.get('id') or event.get('Actor', {}).get('ID', '')
+        if not container_id or action not in RELEVANT_ACTIONS | {'destroy'}:
+            return False
+
+        if action == 'destroy':
+            return self.remove(container_id)
+
+        matches = fetch(container_id)
+        if not matches:
+            return self.remove(container_id)
+        return self.upsert(matches[0])
+
+    def compose_statuses(self, compose_files, base_dir):
+        """Summarize every compose file, like `docker-compose ps`, from one pass over the store"""
+        if not self.connected:
+            return {compose_file: "Error" for compose_file in compose_files}
+
+        base_dir = os.path.normcase(os.path.abspath(base_dir))
+        counts = {compose_file: [0, 0] for compose_file in compose_files}
+        for project in group_compose_projects(self.snapshot()):
+            working_dir = project.working_dir
+            if working_dir and os.path.normcase(os.path.abspath(working_dir)) != base_dir:
+                continue
+            for container in project.containers:
+                for compose_file in container.compose_files:
+                    if compose_file in counts:
+                        counts[compose_file][0] += container.running
+                        counts[compose_file][1] += 1
+
+        return {compose_file: format_compose_status(*counts[compose_file])
+                for compose_file in compose_files}
+
+
+def format_compose_status(running_count, total_count):
+    """Render running/total counts the way the Compose tab shows them"""
+    if total_count == 0:
+        return "Not Started"
+    elif running_count == total_count:
+        return f"Running ({running_count}/{total_count})"
+    elif running_count > 0:
+        return f"Partial ({running_count}/{total_count})"
+    else:
+        return f"Stopped ({total_count})"
@@ -3,17 +3,129 @@
 Simple Flask-based ML Service
 Alternative to BentoML for demo purposes
 """
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, send_file, stream_with_context
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
 import os
+import time
+
+from flat_forest import FlatForest
+from job_queue import JOB_CHUNK_ROWS, JobError, JobStore, resolve_data_path
+from micro_batcher import MicroBatcher
+from payload_formats import (JSON, PayloadError, available_media_types, decode_request,
+                             encode_response, media_type, parse_flag)
+from stream_formats import ChunkEncoder, available_stream_media_types, iter_row_chunks
+from model_artifact import load_model, model_path
+from prediction_cache import PredictionCache, cache_key
+from service_metrics import CONTENT_TYPE, REGISTRY, ROW_BUCKETS, Counter, Gauge, Histogram, StageTimer
 
 # Initialize Flask app
 app = Flask(__name__)
 
-# Simple trained model (for demo purposes)
-model = RandomForestClassifier(n_estimators=100, random_state=42)
-model.fit(np.random.randn(100, 5), np.random.randint(0, 2, 100))
+# Prometheus metrics, served on /metrics for all gunicorn workers together
+REQUESTS = Counter('http_requests_total', "HTTP requests handled", ('endpoint', 'method', 'status'))
+IN_FLIGHT = Gauge('http_requests_in_flight', "HTTP requests being handled", ('endpoint',))
+REQUEST_SECONDS = Histogram('http_request_duration_seconds', "Time to handle an HTTP request", ('endpoint',))
+STAGE_SECONDS = Histogram('prediction_stage_seconds',
+                          "Time per prediction stage: parse, array, inference, serialize", ('endpoint', 'stage'))
+REQUEST_ROWS = Histogram('prediction_request_rows', "Rows per prediction request", ('endpoint',),
+                         buckets=ROW_BUCKETS)
+MODEL_BATCH_ROWS = Histogram('model_batch_rows', "Rows per model call, after micro-batching", buckets=ROW_BUCKETS)
+MODEL_LOAD_SECONDS = Gauge('model_load_seconds', "Time taken to load the model artifact", merge='max')
+MODEL_INFO = Gauge('model_info', "Loaded model and inference backend", ('name', 'version', 'backend'), merge='max')
+
+# Trained once by create_demo_model.py; loaded before gunicorn forks so workers share it
+artifact = load_model(os.environ.get('MODEL_PATH') or model_path())
+model = artifact['model']
+MODEL_VERSION = artifact['version']
+print(f"Loaded model {artifact['name']} v{MODEL_VERSION} in {artifact['load_seconds'] * 1000:.1f} ms")
+MODEL_LOAD_SECONDS.set(artifact['load_seconds'])
+
+# 'flat' evaluates all trees with vectorized array traversal; 'sklearn' uses the estimator itself
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'sklearn')
+flat_forest = None
+# Past a few hundred rows sklearn's compiled tree walk overtakes the vectorized one
+FLAT_FOREST_MAX_ROWS = int(os.environ.get('FLAT_FOREST_MAX_ROWS', 256))
+if INFERENCE_BACKEND == 'flat':
+    flat_forest = artifact.get('flat_forest') or FlatForest.from_sklearn(model)
+MODEL_INFO.labels(artifact['name'], MODEL_VERSION, INFERENCE_BACKEND).set(1)
+
+
+def forest_proba(rows):
+    """Class probabilities from the configured backend"""
+    if flat_forest is not None and len(rows) <= FLAT_FOREST_MAX_ROWS:
+        try:
+            return flat_forest.predict_proba(rows)
+        except ValueError:
+            # NaN/inf or a shape mismatch: let sklearn handle or report it
+            pass
+    return model.predict_proba(rows)
+
+
+def check_rows(rows):
+    """Reject input the model cannot score, before it can share a batch with other requests"""
+    if rows.shape[1] != model.n_features_in_:
+        raise PayloadError(f"Expected {model.n_features_in_} features per row, got {rows.shape[1]}")
+    if not np.isfinite(rows).all():
+        raise PayloadError("Input contains NaN or infinity")
+    return rows
+
+
+def run_model(rows):
+    """Predict labels and probabilities for a 2D batch of rows in one pass over the forest"""
+    MODEL_BATCH_ROWS.observe(len(rows))
+    probability = forest_proba(rows)
+    # Same as model.predict(), which would walk every tree a second time
+    prediction = model.classes_.take(np.argmax(probability, axis=1))
+    return prediction, probability
+
+
+# Concurrent /predict calls share one model call (see gunicorn.conf.py for threads)
+batcher = MicroBatcher(run_model,
+                       max_batch_size=int(os.environ.get('BATCH_MAX_SIZE', 64)),
+                       max_latency=float(os.environ.get('BATCH_MAX_LATENCY_MS', 5)) / 1000)
+
+# Repeated inputs are answered from the cache; large batches are not worth storing
+prediction_cache = PredictionCache.from_env(namespace='flask_ml')
+CACHE_MAX_ROWS = int(os.environ.get('PREDICTION_CACHE_MAX_ROWS', 64))
+
+# Rows scored per step of /predict/stream; bounds its memory use
+STREAM_CHUNK_ROWS = int(os.environ.get('STREAM_CHUNK_ROWS', 10000))
+
+
+def cached_predict(rows):
+    """(prediction, probability) for rows, from the cache when possible"""
+    if not prediction_cache.enabled or len(rows) > CACHE_MAX_ROWS:
+        return batcher(rows)
+    key = cache_key(MODEL_VERSION, rows)
+    result = prediction_cache.get(key)
+    if result is None:
+        result = batcher(rows)
+        prediction_cache.set(key, result)
+    return result
+
+@app.before_request
+def start_request_metrics():
+    if request.endpoint == 'metrics':
+        return  # scrapes would show up in their own snapshots as in flight
+    g.metrics_endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    g.metrics_started = time.perf_counter()
+    IN_FLIGHT.labels(g.metrics_endpoint).inc()
+
+@app.after_request
+def count_request(response):
+    if 'metrics_endpoint' in g:
+        REQUESTS.labels(g.metrics_endpoint, request.method, response.status_code).inc()
+    return response
+
+@app.teardown_request
+def finish_request_metrics(error=None):
+    # Runs twice for streamed responses (see stream_with_context); count the request once
+    endpoint = g.pop('metrics_endpoint', None)
+    if endpoint is None:
+        return
+    # Failed requests were already counted by after_request, from handle_exception's 500 response
+    IN_FLIGHT.labels(endpoint).dec()
+    REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - g.metrics_started)
 
 @app.route('/health', methods=['GET'])
 def health():
@@ -21,41 +133,161 @@ def health():
     return jsonify({
         "status": "healthy",
         "service": "flask_ml_service",
-        "model": "random_forest_demo"
+        "model": "random_forest_demo",
+        "model_version": MODEL_VERSION,
+        "backend": INFERENCE_BACKEND
     })
 
 @app.route('/predict', methods=['POST'])
 def predict():
-    """Prediction endpoint"""
+    """Prediction endpoint; the body may be JSON, .npy, Arrow IPC or msgpack (see Content-Type)"""
+    timer = StageTimer(STAGE_SECONDS, 'predict')
     try:
-        data = request.get_json()
-
-        if not data or 'data' not in data:
+        try:
+            input_data, options = decode_request(request.content_type, request.get_data(cache=False), timer)
+            check_rows(input_data)
+        except PayloadError as e:
             return jsonify({
-                "error": "No data provided",
+                "error": str(e),
                 "example": {"data": [1, 2, 3, 4, 5]}
-            }), 400
+            }), e.status
 
-        input_data = np.array(data['data'])
+        # Make prediction
+        REQUEST_ROWS.labels('predict').observe(len(input_data))
+        prediction, probability = cached_predict(input_data)
+        timer.mark('inference')
 
-        # Reshape if needed
-        if len(input_data.shape) == 1:
-            input_data = input_data.reshape(1, -1)
+        # Clients that only need labels can skip serializing the probabilities
+        return_probability = parse_flag(options.get('return_probability',
+                                                    request.args.get('return_probability')))
 
-        # Make prediction
-        prediction = model.predict(input_data)
-        probability = model.predict_proba(input_data)
+        # Answer in the best format the client accepts; JSON unless asked otherwise
+        kind = request.accept_mimetypes.best_match(available_media_types(), default=JSON)
+        if kind != JSON:
+            body, content_type = encode_response(kind, prediction,
+                                                 probability if return_probability else None,
+                                                 {"input_shape": input_data.shape, "model": "random_forest_demo"})
+            timer.mark('serialize')
+            return Response(body, content_type=content_type)
 
-        return jsonify({
+        response = {
             "prediction": prediction.tolist(),
-            "probability": probability.tolist(),
             "input_shape": input_data.shape,
             "model": "random_forest_demo"
-        })
+        }
+        if return_probability:
+            response["probability"] = probability.tolist()
+        response = jsonify(response)
+        timer.mark('serialize')
+        return response
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/predict/stream', methods=['POST'])
+def predict_stream():
+    """Score a CSV, NDJSON or Arrow IPC body chunk by chunk, streaming results back in the same format"""
+    kind = media_type(request.content_type)
+    if kind not in available_stream_media_types():
+        return jsonify({
+            "error": f"Unsupported Content-Type {request.content_type}",
+            "supported": available_stream_media_types()
+        }), 415
+
+    return_probability = parse_flag(request.args.get('return_probability'))
+    chunks = iter_row_chunks(kind, request.stream, STREAM_CHUNK_ROWS)
+    encoder = ChunkEncoder(kind)
+
+    def generate():
+        # Per chunk: reading and parsing it, scoring it, encoding the results
+        timer = StageTimer(STAGE_SECONDS, 'predict_stream')
+        try:
+            for rows in chunks:
+                timer.mark('parse')
+                REQUEST_ROWS.labels('predict_stream').observe(len(rows))
+                prediction, probability = run_model(check_rows(rows))
+                timer.mark('inference')
+                data = encoder.encode(prediction, probability if return_probability else None)
+                timer.mark('serialize')
+                yield data
+                timer.restart()  # time spent sending belongs to no stage
+            yield encoder.close()
+        except (PayloadError, ValueError) as e:
+            # The status line is already sent; report the failure in-band
+            yield encoder.error(str(e))
+
+    return Response(stream_with_context(generate()), content_type=kind)
+
+# Each worker process opens its own connection to the job queue, after the fork
+_job_stores = {}
+
+
+def job_store():
+    store = _job_stores.get(os.getpid())
+    if store is None:
+        store = _job_stores[os.getpid()] = JobStore()
+    return store
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue a dataset file (relative to the data directory) for offline scoring"""
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict) or 'input_path' not in data:
+        return jsonify({
+            "error": "No input_path provided",
+            "example": {"input_path": "crm_records.csv", "chunk_rows": JOB_CHUNK_ROWS}
+        }), 400
+    chunk_rows = data.get('chunk_rows', JOB_CHUNK_ROWS)
+    if not isinstance(data['input_path'], str) or not isinstance(data.get('output_path') or '', str):
+        return jsonify({"error": "input_path and output_path must be strings"}), 400
+    if not isinstance(chunk_rows, int) or isinstance(chunk_rows, bool):
+        return jsonify({"error": f"chunk_rows must be a positive integer, not {chunk_rows!r}"}), 400
+    try:
+        output_path = resolve_data_path(data['output_path']) if data.get('output_path') else None
+        job = job_store().submit(resolve_data_path(data['input_path']), output_path, chunk_rows=chunk_rows)
+    except (JobError, TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(job), 202
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """Most recent scoring jobs"""
+    try:
+        limit = int(request.args.get('limit', 50))
+        if limit <= 0:
+            raise ValueError(limit)
+    except ValueError:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    return jsonify({"jobs": job_store().list(limit=limit)})
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status, progress and throughput of one job"""
+    job = job_store().get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """Download the scored output of a finished job"""
+    job = job_store().get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job['status'] != 'done':
+        return jsonify({"error": f"Job is {job['status']}", "job": job}), 409
+    return send_file(job['output_path'], as_attachment=True)
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Prediction cache counters of this worker process"""
+    return jsonify(dict(prediction_cache.stats(), pid=os.getpid()))
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics, summed over all worker processes"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
 @app.route('/info', methods=['GET'])
 def info():
     """Service information endpoint"""
@@ -65,9 +297,14 @@ def info():
         "endpoints": {
             "health": "GET /health",
             "predict": "POST /predict",
+            "predict_stream": "POST /predict/stream (CSV, NDJSON or Arrow IPC body)",
+            "jobs": "POST /jobs, GET /jobs, GET /jobs/<id>, GET /jobs/<id>/result",
+            "cache": "GET /cache/stats",
+            "metrics": "GET /metrics (Prometheus)",
             "info": "GET /info"
         },
-        "input_format": "JSON with 'data' array",
+        "input_format": "JSON with 'data' array; set 'return_probability' to false for labels only",
+        "media_types": available_media_types(),
         "output_format": "JSON with prediction results"
     })
 
@@ -85,6 +322,7 @@ def root():
     })
 
 if __name__ == '__main__':
+    # Development only; production runs under gunicorn (see gunicorn.conf.py)
     port = int(os.environ.get('PORT', 5000))
     host = os.environ.get('HOST', '0.0.0.0')
 
@@ -95,4 +333,4 @@ if __name__ == '__main__':
     print("  • GET  /info - Service information")
     print("  • GET  / - Service overview")
 
-    app.run(host=host, port=port, debug=True)
+    app.run(host=host, port=port, debug=os.environ.get('FLASK_DEBUG') == '1')
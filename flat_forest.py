@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Flat Random Forest Inference
+Compiles a fitted RandomForestClassifier into contiguous node arrays and
+evaluates batches level by level across all trees with vectorized NumPy
+"""
+import numpy as np
+
+# Rows per traversal block; bounds the (rows x trees) index arrays
+CHUNK_ROWS = 4096
+
+
+class FlatForest:
+    """Array form of a RandomForestClassifier with the same predict_proba output.
+
+    All trees share one set of node arrays, indexed globally. Leaves point
+    to themselves, so after max_depth steps every (row, tree) pair sits on
+    its leaf without any per-tree branching. Tree probabilities are summed
+    in estimator order and divided by the tree count, as sklearn does, so
+    results are bit-for-bit identical.
+    """
+
+    def __init__(self, feature, threshold, left, right, leaf_proba, roots, max_depth, classes):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.leaf_proba = leaf_proba
+        self.roots = roots
+        self.max_depth = max_depth
+        self.classes_ = classes
+        self.n_features_in_ = None
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        """Compile a fitted single-output RandomForestClassifier"""
+        if getattr(forest, 'n_outputs_', 1) != 1:
+            raise ValueError("Only single-output forests can be flattened")
+
+        features, thresholds, lefts, rights, probas, roots = [], [], [], [], [], []
+        offset = max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count) + offset
+            is_leaf = tree.children_left == -1
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, nodes, tree.children_left + offset))
+            rights.append(np.where(is_leaf, nodes, tree.children_right + offset))
+
+            proba = np.array(tree.value[:, 0, :forest.n_classes_], dtype=np.float64)
+            if (proba.sum(axis=1) > 1 + 1e-9).any():
+                # Older scikit-learn stores weighted counts and normalizes at predict time
+                normalizer = proba.sum(axis=1)[:, np.newaxis]
+                normalizer[normalizer == 0.0] = 1.0
+                proba /= normalizer
+            probas.append(proba)
+
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += tree.node_count
+
+        flat = cls(feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+                   threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+                   left=np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp),
+                   right=np.ascontiguousarray(np.concatenate(rights), dtype=np.intp),
+                   leaf_proba=np.ascontiguousarray(np.concatenate(probas)),
+                   roots=np.asarray(roots, dtype=np.intp),
+                   max_depth=max_depth,
+                   classes=np.asarray(forest.classes_))
+        flat.n_features_in_ = forest.n_features_in_
+        return flat
+
+    def apply(self, X):
+        """Leaf index (global) of every row in every tree, shape (rows, trees)"""
+        rows = np.arange(len(X))[:, np.newaxis]
+        node = np.repeat(self.roots[np.newaxis, :], len(X), axis=0)
+        for _ in range(self.max_depth):
+            # float32 inputs against float64 thresholds, exactly like the Cython trees
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict_proba(self, X):
+        """Class probabilities for a 2D array of finite features"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[-1]} features, but the model expects {self.n_features_in_}")
+        if not np.isfinite(X).all():
+            raise ValueError("Input X contains NaN or infinity")
+
+        n_trees = len(self.roots)
+        proba = np.empty((len(X), self.leaf_proba.shape[1]))
+        for start in range(0, len(X), CHUNK_ROWS):
+            leaves = self.apply(X[start:start + CHUNK_ROWS])
+            total = np.zeros((len(leaves), self.leaf_proba.shape[1]))
+            for tree in range(n_trees):
+                total += self.leaf_proba[leaves[:, tree]]
+            proba[start:start + CHUNK_ROWS] = total / n_trees
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
@@ -4,17 +4,65 @@ import json
 import subprocess
 import threading
 import time
+import queue
+import functools
+from collections import deque
 from datetime import datetime
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QTabWidget, QWidget,
                              QVBoxLayout, QHBoxLayout, QGridLayout, QLabel,
-                             QPushButton, QTextEdit, QTableWidget, QTableWidgetItem,
+                             QPushButton, QPlainTextEdit, QTableView, QCheckBox,
                              QHeaderView, QProgressBar, QGroupBox, QSplitter,
                              QStatusBar, QMessageBox, QMenuBar, QAction, QComboBox,
-                             QLineEdit, QToolBar, QFrame)
-from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal, QUrl
-from PyQt5.QtGui import QFont, QIcon, QPixmap, QPalette, QColor
+                             QLineEdit, QToolBar, QFrame, QStyledItemDelegate)
+from PyQt5.QtCore import (Qt, QTimer, QThread, pyqtSignal, QUrl, QObject,
+                          QRunnable, QThreadPool, QAbstractTableModel, QModelIndex,
+                          QFileSystemWatcher, QPointF)
+from PyQt5.QtGui import QFont, QIcon, QPixmap, QPalette, QColor, QPainter, QPen, QPolygonF
 from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEnginePage, QWebEngineSettings
 
+from docker_state import ContainerStateStore, list_containers, open_event_stream, open_log_stream
+from log_index import LogIndex, LEVELS
+from compose_model import ComposeModelCache
+from service_resolver import ServiceResolver
+from resource_stats import EngineStatsRejected, ResourceStatsStore, open_stats_stream, format_bytes
+
+# Background job limits
+MAX_BACKGROUND_JOBS = 4
+COMMAND_TIMEOUT = 60
+COMPOSE_TIMEOUT = 600  # `up` may have to pull images
+
+# Log viewer limits; memory stays flat however long a stream runs
+LOG_BUFFER_LINES = 10000
+LOG_VIEW_MAX_LINES = 10000
+LOG_FLUSH_INTERVAL_MS = 250
+
+# Log search index
+LOG_INDEX_INITIAL_LINES = 1000
+LOG_INDEX_QUEUE_LINES = 50000
+LOG_SEARCH_LIMIT = 2000
+LOG_LEVEL_FILTERS = {
+    "All levels": None,
+    "Errors": LEVELS[:2],
+    "Warnings and above": LEVELS[:3],
+    "Info and above": LEVELS[:4],
+    "Debug and above": LEVELS[:5]
+}
+# Resource columns of the services table: header, history field, plotted as a rate
+RESOURCE_COLUMNS = [
+    ("CPU", 'cpu_percent', False),
+    ("Memory", 'mem_usage', False),
+    ("Net RX", 'net_rx', True),
+    ("Disk Write", 'blk_write', True)
+]
+
+LOG_TIME_RANGES = {
+    "Last 15 minutes": 15 * 60,
+    "Last hour": 60 * 60,
+    "Last 24 hours": 24 * 60 * 60,
+    "Last 7 days": 7 * 24 * 60 * 60,
+    "All indexed": None
+}
+
 
 class CustomWebEnginePage(QWebEnginePage):
     """Custom WebEngine page with enhanced error handling"""
@@ -148,18 +196,76 @@ class DockerComposeManager(QMainWindow):
             }
         }
 
-        self.supporting_services = ['postgres_n8n', 'postgres_twenty', 'redis', 'mongo']
+        self.supporting_services = {
+            'postgres_n8n': 'PostgreSQL (N8N)',
+            'postgres_twenty': 'PostgreSQL (Twenty)',
+            'redis': 'Redis',
+            'mongo': 'MongoDB'
+        }
+
+        # Other container/compose names that identify a service
+        self.service_aliases = {
+            'portainer_demoforge': 'portainer',
+            'flask_ml_api': 'bentoml',
+            'flask-ml-api': 'bentoml'
+        }
+
+        # Shared container state, filled by the monitoring thread
+        self.container_store = ContainerStateStore()
+        self.resource_stats = ResourceStatsStore()
+
+        # Parsed compose files, re-read only when they change on disk
+        self.compose_cache = ComposeModelCache(os.path.dirname(os.path.abspath(__file__)))
+        self.compose_watcher = QFileSystemWatcher([self.compose_cache.base_dir], self)
+        self.compose_watcher.directoryChanged.connect(self.on_compose_dir_changed)
+        self.compose_watcher.fileChanged.connect(self.on_compose_dir_changed)
+        self.watch_compose_files()
+
+        # One container -> service mapping shared by every view
+        self.resolver = ServiceResolver(self.services, self.supporting_services, self.service_aliases,
+                                        [self.compose_cache.get(f) for f in self.get_compose_files()])
+
+        # All blocking CLI work runs here, never on the GUI thread
+        self.job_executor = JobExecutor(parent=self)
+
+        # Fitting columns to contents is costly; do it at most every 2 seconds
+        self.column_resize_timer = QTimer()
+        self.column_resize_timer.setSingleShot(True)
+        self.column_resize_timer.setInterval(2000)
+        self.column_resize_timer.timeout.connect(self.resize_table_columns)
 
         # Initialize UI
         self.init_ui()
         self.init_menu()
         self.init_status_bar()
 
+        # Collected service logs, indexed on disk for search
+        self.log_collectors = {}
+        try:
+            self.log_index = LogIndex()
+            self.log_index_writer = LogIndexWriter(self.log_index, self)
+            self.log_index_writer.start()
+        except Exception as e:
+            print(f"Log index disabled: {e}")
+            self.log_index = self.log_index_writer = None
+
+        # Coalesce bursts of Docker events into one view refresh
+        self.view_refresh_timer = QTimer()
+        self.view_refresh_timer.setSingleShot(True)
+        self.view_refresh_timer.setInterval(200)
+        self.view_refresh_timer.timeout.connect(self.refresh_all_data)
+
         # Start monitoring thread
-        self.monitoring_thread = ContainerMonitor(self)
+        self.monitoring_thread = ContainerMonitor(self.container_store, self.resolver, self)
         self.monitoring_thread.status_updated.connect(self.update_container_status)
+        self.monitoring_thread.store_changed.connect(self.view_refresh_timer.start)
         self.monitoring_thread.start()
 
+        # Resource usage of running containers, sampled once a second
+        self.resource_monitor = ResourceMonitor(self.container_store, self.resource_stats, self)
+        self.resource_monitor.samples_updated.connect(self.refresh_services_table)
+        self.resource_monitor.start()
+
         # Auto-refresh every 5 seconds
         self.refresh_timer = QTimer()
         self.refresh_timer.timeout.connect(self.refresh_all_data)
@@ -330,9 +436,16 @@ class DockerComposeManager(QMainWindow):
         layout = QVBoxLayout(widget)
 
         # Services table
-        self.services_table = QTableWidget()
-        self.services_table.setColumnCount(6)
-        self.services_table.setHorizontalHeaderLabels(["Service", "Status", "Port", "Container", "Image", "ID"])
+        self.services_model = KeyedTableModel(["Service", "Status", "Port", "Container", "Image", "ID"] +
+                                              [header for header, _, _ in RESOURCE_COLUMNS], self)
+        self.services_table = QTableView()
+        self.services_table.setModel(self.services_model)
+        for column, (_, field, rate) in enumerate(RESOURCE_COLUMNS, start=6):
+            self.services_table.setItemDelegateForColumn(
+                column, SparklineDelegate(self.resource_stats, field, rate, self.services_table))
+            self.services_table.setColumnWidth(column, 110)
+        self.services_table.verticalHeader().setVisible(False)
+        self.rendered_store_version = None
 
         # Set column widths
         self.services_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
@@ -348,7 +461,7 @@ class DockerComposeManager(QMainWindow):
 
         # Style the table
         self.services_table.setAlternatingRowColors(True)
-        self.services_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.services_table.setSelectionBehavior(QTableView.SelectRows)
 
         layout.addWidget(self.services_table)
 
@@ -393,9 +506,10 @@ class DockerComposeManager(QMainWindow):
         layout.addWidget(title)
 
         # Compose projects table
-        self.compose_table = QTableWidget()
-        self.compose_table.setColumnCount(4)
-        self.compose_table.setHorizontalHeaderLabels(["Project", "Status", "Services", "Actions"])
+        self.compose_model = KeyedTableModel(["Project", "Status", "Services", "Actions"], self)
+        self.compose_table = QTableView()
+        self.compose_table.setModel(self.compose_model)
+        self.compose_table.verticalHeader().setVisible(False)
 
         # Set column widths
         self.compose_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
@@ -407,7 +521,7 @@ class DockerComposeManager(QMainWindow):
 
         # Style the table
         self.compose_table.setAlternatingRowColors(True)
-        self.compose_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.compose_table.setSelectionBehavior(QTableView.SelectRows)
 
         layout.addWidget(self.compose_table)
 
@@ -443,183 +557,136 @@ class DockerComposeManager(QMainWindow):
     def get_compose_files(self):
         """Get all docker-compose files in the current directory"""
         try:
-            files = [f for f in os.listdir(os.path.dirname(__file__))
-                    if f.startswith('docker-compose') and f.endswith('.yml')]
-            return sorted(files)
+            return self.compose_cache.list_files()
         except Exception as e:
             print(f"Error getting compose files: {e}")
             return []
 
     def get_compose_services(self, compose_file):
         """Get services from a docker-compose file"""
-        try:
-            compose_path = os.path.join(os.path.dirname(__file__), compose_file)
-            with open(compose_path, 'r') as f:
-                content = f.read()
-
-            # Simple parsing to find services
-            lines = content.split('\n')
-            services = []
-            in_services = False
-            for line in lines:
-                line = line.strip()
-                if line == 'services:':
-                    in_services = True
-                elif in_services and line.endswith(':') and not line.startswith('  '):
-                    services.append(line[:-1])
-                elif in_services and line == '' and services:
-                    break
+        model = self.compose_cache.get(compose_file)
+        if model.error:
+            print(f"Error parsing {compose_file}: {model.error}")
+        return list(model.services)
+
+    def on_compose_dir_changed(self, path):
+        """Re-render the Compose tab when a compose file is added, removed or edited"""
+        if path != self.compose_cache.base_dir:
+            # Editors often replace files, which drops them from the watch list
+            self.compose_cache.invalidate(os.path.basename(path))
+            if os.path.exists(path) and path not in self.compose_watcher.files():
+                self.compose_watcher.addPath(path)
+        self.watch_compose_files()
+        self.resolver.load_compose_models([self.compose_cache.get(f) for f in self.get_compose_files()])
+        self.refresh_compose_projects()
 
-            return services
-        except Exception as e:
-            print(f"Error parsing {compose_file}: {e}")
-            return []
+    def watch_compose_files(self):
+        """Keep every compose file in the directory on the watch list"""
+        watched = set(self.compose_watcher.files())
+        for compose_file in self.get_compose_files():
+            path = os.path.join(self.compose_cache.base_dir, compose_file)
+            if path not in watched:
+                self.compose_watcher.addPath(path)
 
-    def get_compose_status(self, compose_file):
-        """Get the status of a docker-compose project"""
-        try:
-            project_name = compose_file.replace('docker-compose.', '').replace('.yml', '')
-            result = subprocess.run(['docker-compose', '-f', compose_file, 'ps', '--format', '{{.Status}}'],
-                                  cwd=os.path.dirname(__file__), capture_output=True, text=True, timeout=10)
-
-            if result.returncode == 0:
-                lines = result.stdout.strip().split('\n')
-                running_count = sum(1 for line in lines if 'Up' in line)
-                total_count = len([line for line in lines if line.strip()])
-
-                if total_count == 0:
-                    return "Not Started"
-                elif running_count == total_count:
-                    return f"Running ({running_count}/{total_count})"
-                elif running_count > 0:
-                    return f"Partial ({running_count}/{total_count})"
-                else:
-                    return f"Stopped ({total_count})"
-            else:
-                return "Error"
-        except Exception as e:
-            return "Error"
+    def get_compose_statuses(self, compose_files):
+        """Get the status of every docker-compose project from one pass over the container store"""
+        return self.container_store.compose_statuses(compose_files, os.path.dirname(__file__))
 
     def refresh_compose_projects(self):
         """Refresh the compose projects table"""
         try:
             compose_files = self.get_compose_files()
 
-            self.compose_table.setRowCount(0)
-
             if not compose_files:
-                self.compose_table.setRowCount(1)
-                self.compose_table.setItem(0, 0, QTableWidgetItem("No docker-compose files found"))
-                self.compose_table.setItem(0, 1, QTableWidgetItem("N/A"))
-                self.compose_table.setItem(0, 2, QTableWidgetItem("Check directory"))
-                self.compose_table.setItem(0, 3, QTableWidgetItem("N/A"))
+                self.update_table(self.compose_model, [
+                    ('__placeholder__', ["No docker-compose files found", "N/A", "Check directory", "N/A"])
+                ])
                 return
 
-            for compose_file in compose_files:
-                row = self.compose_table.rowCount()
-                self.compose_table.insertRow(row)
+            statuses = self.get_compose_statuses(compose_files)
+            rows = []
 
+            for compose_file in compose_files:
                 # Project name
                 project_name = compose_file.replace('docker-compose.', '').replace('.yml', '').title()
-                self.compose_table.setItem(row, 0, QTableWidgetItem(project_name))
 
                 # Status
-                status = self.get_compose_status(compose_file)
-                status_item = QTableWidgetItem(status)
+                status = statuses[compose_file]
                 if "Running" in status:
-                    status_item.setForeground(QColor('green'))
+                    status_color = 'green'
                 elif "Partial" in status:
-                    status_item.setForeground(QColor('orange'))
+                    status_color = 'orange'
                 elif "Stopped" in status:
-                    status_item.setForeground(QColor('red'))
+                    status_color = 'red'
                 else:
-                    status_item.setForeground(QColor('gray'))
-                self.compose_table.setItem(row, 1, status_item)
+                    status_color = 'gray'
 
                 # Services
                 services = self.get_compose_services(compose_file)
                 services_text = ", ".join(services) if services else "None found"
-                self.compose_table.setItem(row, 2, QTableWidgetItem(services_text))
 
                 # Actions (file name for reference)
-                self.compose_table.setItem(row, 3, QTableWidgetItem(compose_file))
+                rows.append((compose_file, [project_name, (status, status_color), services_text, compose_file]))
 
-            self.compose_table.resizeColumnsToContents()
+            self.update_table(self.compose_model, rows)
 
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Failed to refresh compose projects: {str(e)}")
 
+    def update_table(self, model, rows):
+        """Apply rows to a keyed model; column resizing is throttled"""
+        if model.update_rows(rows) and not self.column_resize_timer.isActive():
+            self.column_resize_timer.start()
+
+    def resize_table_columns(self):
+        """Fit table columns to their contents (at most once per throttle interval)"""
+        self.services_table.resizeColumnsToContents()
+        self.compose_table.resizeColumnsToContents()
+
     def start_selected_compose_project(self):
         """Start the selected compose project"""
-        current_row = self.compose_table.currentRow()
+        current_row = self.compose_table.currentIndex().row()
         if current_row == -1:
             QMessageBox.warning(self, "Warning", "Please select a compose project first.")
             return
 
-        compose_file = self.compose_table.item(current_row, 3).text()
-        project_name = self.compose_table.item(current_row, 0).text()
+        compose_file = self.compose_model.cell_text(current_row, 3)
+        project_name = self.compose_model.cell_text(current_row, 0)
 
-        try:
-            result = subprocess.run(['docker-compose', '-f', compose_file, 'up', '-d'],
-                                  cwd=os.path.dirname(__file__), capture_output=True, text=True)
-
-            if result.returncode == 0:
-                QMessageBox.information(self, "Success", f"Project '{project_name}' started successfully!")
-                self.refresh_compose_projects()
-                self.refresh_all_data()
-            else:
-                QMessageBox.warning(self, "Error", f"Failed to start project '{project_name}':\n{result.stderr}")
-
-        except subprocess.CalledProcessError as e:
-            QMessageBox.warning(self, "Error", f"Failed to start project '{project_name}': {e}")
+        self.run_docker_command(['docker-compose', '-f', compose_file, 'up', '-d'],
+                                f"Project '{project_name}' started successfully!",
+                                f"Failed to start project '{project_name}'",
+                                timeout=COMPOSE_TIMEOUT)
 
     def stop_selected_compose_project(self):
         """Stop the selected compose project"""
-        current_row = self.compose_table.currentRow()
+        current_row = self.compose_table.currentIndex().row()
         if current_row == -1:
             QMessageBox.warning(self, "Warning", "Please select a compose project first.")
             return
 
-        compose_file = self.compose_table.item(current_row, 3).text()
-        project_name = self.compose_table.item(current_row, 0).text()
-
-        try:
-            result = subprocess.run(['docker-compose', '-f', compose_file, 'down'],
-                                  cwd=os.path.dirname(__file__), capture_output=True, text=True)
-
-            if result.returncode == 0:
-                QMessageBox.information(self, "Success", f"Project '{project_name}' stopped successfully!")
-                self.refresh_compose_projects()
-                self.refresh_all_data()
-            else:
-                QMessageBox.warning(self, "Error", f"Failed to stop project '{project_name}':\n{result.stderr}")
+        compose_file = self.compose_model.cell_text(current_row, 3)
+        project_name = self.compose_model.cell_text(current_row, 0)
 
-        except subprocess.CalledProcessError as e:
-            QMessageBox.warning(self, "Error", f"Failed to stop project '{project_name}': {e}")
+        self.run_docker_command(['docker-compose', '-f', compose_file, 'down'],
+                                f"Project '{project_name}' stopped successfully!",
+                                f"Failed to stop project '{project_name}'",
+                                timeout=COMPOSE_TIMEOUT)
 
     def restart_selected_compose_project(self):
         """Restart the selected compose project"""
-        current_row = self.compose_table.currentRow()
+        current_row = self.compose_table.currentIndex().row()
         if current_row == -1:
             QMessageBox.warning(self, "Warning", "Please select a compose project first.")
             return
 
-        compose_file = self.compose_table.item(current_row, 3).text()
-        project_name = self.compose_table.item(current_row, 0).text()
+        compose_file = self.compose_model.cell_text(current_row, 3)
+        project_name = self.compose_model.cell_text(current_row, 0)
 
-        try:
-            result = subprocess.run(['docker-compose', '-f', compose_file, 'restart'],
-                                  cwd=os.path.dirname(__file__), capture_output=True, text=True)
-
-            if result.returncode == 0:
-                QMessageBox.information(self, "Success", f"Project '{project_name}' restarted successfully!")
-                self.refresh_compose_projects()
-                self.refresh_all_data()
-            else:
-                QMessageBox.warning(self, "Error", f"Failed to restart project '{project_name}':\n{result.stderr}")
-
-        except subprocess.CalledProcessError as e:
-            QMessageBox.warning(self, "Error", f"Failed to restart project '{project_name}': {e}")
+        self.run_docker_command(['docker-compose', '-f', compose_file, 'restart'],
+                                f"Project '{project_name}' restarted successfully!",
+                                f"Failed to restart project '{project_name}'",
+                                timeout=COMPOSE_TIMEOUT)
 
     def create_logs_tab(self):
         """Create the logs viewing tab"""
@@ -646,6 +713,11 @@ class DockerComposeManager(QMainWindow):
         self.tail_lines_combo.setCurrentText("200")
         selector_layout.addWidget(self.tail_lines_combo)
 
+        self.follow_logs_checkbox = QCheckBox("Follow")
+        self.follow_logs_checkbox.setChecked(True)
+        self.follow_logs_checkbox.toggled.connect(self.load_service_logs)
+        selector_layout.addWidget(self.follow_logs_checkbox)
+
         refresh_logs_btn = QPushButton("🔄 Refresh Logs")
         refresh_logs_btn.clicked.connect(self.load_service_logs)
         selector_layout.addWidget(refresh_logs_btn)
@@ -653,11 +725,60 @@ class DockerComposeManager(QMainWindow):
         selector_layout.addStretch()
         layout.addLayout(selector_layout)
 
-        # Logs display
-        self.logs_text = QTextEdit()
+        # Logs display; old lines are discarded past the block limit
+        self.logs_text = QPlainTextEdit()
         self.logs_text.setFont(QFont("Consolas", 9))
         self.logs_text.setReadOnly(True)
-        layout.addWidget(self.logs_text)
+        self.logs_text.setMaximumBlockCount(LOG_VIEW_MAX_LINES)
+
+        # Search over the on-disk log index
+        search_widget = QWidget()
+        search_layout = QVBoxLayout(search_widget)
+        search_layout.setContentsMargins(0, 0, 0, 0)
+
+        search_controls = QHBoxLayout()
+        self.log_search_input = QLineEdit()
+        self.log_search_input.setPlaceholderText("Search indexed logs...")
+        self.log_search_input.returnPressed.connect(self.search_logs)
+        search_controls.addWidget(self.log_search_input)
+
+        self.log_regex_checkbox = QCheckBox("Regex")
+        search_controls.addWidget(self.log_regex_checkbox)
+
+        self.log_level_combo = QComboBox()
+        self.log_level_combo.addItems(list(LOG_LEVEL_FILTERS))
+        search_controls.addWidget(self.log_level_combo)
+
+        self.log_scope_combo = QComboBox()
+        self.log_scope_combo.addItems(["All services", "Selected service"])
+        search_controls.addWidget(self.log_scope_combo)
+
+        self.log_time_combo = QComboBox()
+        self.log_time_combo.addItems(list(LOG_TIME_RANGES))
+        self.log_time_combo.setCurrentText("Last hour")
+        search_controls.addWidget(self.log_time_combo)
+
+        search_btn = QPushButton("🔍 Search")
+        search_btn.clicked.connect(self.search_logs)
+        search_controls.addWidget(search_btn)
+        search_layout.addLayout(search_controls)
+
+        self.log_search_results = QPlainTextEdit()
+        self.log_search_results.setFont(QFont("Consolas", 9))
+        self.log_search_results.setReadOnly(True)
+        search_layout.addWidget(self.log_search_results)
+
+        splitter = QSplitter(Qt.Vertical)
+        splitter.addWidget(self.logs_text)
+        splitter.addWidget(search_widget)
+        splitter.setSizes([600, 300])
+        layout.addWidget(splitter)
+
+        # Streamed lines are appended in batches
+        self.log_worker = None
+        self.log_flush_timer = QTimer()
+        self.log_flush_timer.setInterval(LOG_FLUSH_INTERVAL_MS)
+        self.log_flush_timer.timeout.connect(self.flush_log_buffer)
 
         return widget
 
@@ -885,19 +1006,14 @@ class DockerComposeManager(QMainWindow):
         self.refresh_services_table()
         self.refresh_compose_projects()
         self.update_connection_status()
+        self.update_log_collectors()
 
     def update_connection_status(self):
         """Update Docker connection status"""
-        try:
-            result = subprocess.run(['docker', 'info'],
-                                  capture_output=True, text=True, timeout=10)
-            if result.returncode == 0:
-                self.connection_label.setText("Docker: Connected")
-                self.connection_label.setStyleSheet("color: green; font-weight: bold;")
-            else:
-                self.connection_label.setText("Docker: Error")
-                self.connection_label.setStyleSheet("color: red; font-weight: bold;")
-        except:
+        if self.container_store.connected:
+            self.connection_label.setText("Docker: Connected")
+            self.connection_label.setStyleSheet("color: green; font-weight: bold;")
+        else:
             self.connection_label.setText("Docker: Disconnected")
             self.connection_label.setStyleSheet("color: red; font-weight: bold;")
 
@@ -917,256 +1033,249 @@ class DockerComposeManager(QMainWindow):
                     indicator.setStyleSheet("color: #ff6b6b; font-size: 16px; font-weight: bold;")
 
     def refresh_services_table(self):
-        """Refresh the services table with current container information"""
+        """Refresh the services table from the shared container store"""
         try:
-            print("🔄 Refreshing services table...")  # Debug log
-
-            # Get container information with proper format
-            result = subprocess.run(['docker', 'ps', '-a', '--format',
-                                   '{{.Names}}\t{{.Status}}\t{{.Ports}}\t{{.Image}}\t{{.ID}}'],
-                                  capture_output=True, text=True, timeout=15)
-
-            print(f"Docker command exit code: {result.returncode}")  # Debug log
-            print(f"Docker stdout: {result.stdout[:200]}...")  # Debug log first 200 chars
-            print(f"Docker stderr: {result.stderr}")  # Debug log
-
-            if result.returncode == 0:
-                self.services_table.setRowCount(0)
-                lines = result.stdout.strip().split('\n')
-                print(f"Found {len(lines)} container lines")  # Debug log
-
-                # Clear existing rows
-                self.services_table.setRowCount(0)
-
-                containers_found = 0
-
-                for line in lines:
-                    if line.strip():
-                        parts = line.split('\t')
-                        if len(parts) >= 5:  # We need at least 5 parts now (Name, Status, Ports, Image, ID)
-                            container_name = parts[0]
-                            status = parts[1]
-                            ports = parts[2] if parts[2] and parts[2] != '<no value>' else 'N/A'
-                            image = parts[3]
-                            container_id = parts[4]
-
-                            print(f"Processing container: {container_name} - {status}")  # Debug log
-
-                            # Map container names to services
-                            service_id = None
-                            service_display_name = "Unknown"
-
-                            # Check for known service mappings
-                            service_mapping = {
-                                'twenty': 'Twenty CRM',
-                                'typebot': 'Typebot',
-                                'portainer': 'Portainer',
-                                'portainer_demoforge': 'Portainer',
-                                'ollama': 'Ollama',
-                                'n8n': 'N8N',
-                                'flask_ml_api': 'Flask ML API',
-                                'postgres_n8n': 'PostgreSQL (N8N)',
-                                'postgres_twenty': 'PostgreSQL (Twenty)',
-                                'redis': 'Redis',
-                                'mongo': 'MongoDB'
-                            }
-
-                            for container_key, display_name in service_mapping.items():
-                                if container_key in container_name.lower():
-                                    service_id = container_key
-                                    service_display_name = display_name
-                                    print(f"Mapped {container_name} to {service_id}")  # Debug log
-                                    break
-
-                            # If no mapping found, try to match with service IDs
-                            if not service_id:
-                                for sid in self.services.keys():
-                                    if sid in container_name.lower():
-                                        service_id = sid
-                                        service_display_name = self.services[sid]['name']
-                                        print(f"Mapped {container_name} to {service_id} (service key)")  # Debug log
-                                        break
-
-                            # Always show the container if it's running, even if not in our services list
-                            if service_id or 'Up' in status:
-                                containers_found += 1
-                                row = self.services_table.rowCount()
-                                self.services_table.insertRow(row)
-
-                                # Service/Container name
-                                display_name = service_display_name if service_id else container_name
-                                self.services_table.setItem(row, 0, QTableWidgetItem(display_name))
-
-                                # Status with color coding
-                                status_item = QTableWidgetItem(status)
-                                if 'Up' in status:
-                                    status_item.setForeground(QColor('green'))
-                                    status_item.setText("🟢 Running")
-                                elif 'Exited' in status:
-                                    status_item.setForeground(QColor('red'))
-                                    status_item.setText("🔴 Stopped")
-                                else:
-                                    status_item.setForeground(QColor('orange'))
-                                    status_item.setText("🟡 " + status[:20])
-                                self.services_table.setItem(row, 1, status_item)
-
-                                # Port information
-                                port_info = str(self.services.get(service_id, {}).get('port', 'N/A')) if service_id else 'N/A'
-                                self.services_table.setItem(row, 2, QTableWidgetItem(port_info))
-
-                                # Container name (shortened)
-                                short_name = container_name[:30] + "..." if len(container_name) > 30 else container_name
-                                self.services_table.setItem(row, 3, QTableWidgetItem(short_name))
-
-                                # Image (shortened)
-                                short_image = image[:40] + "..." if len(image) > 40 else image
-                                self.services_table.setItem(row, 4, QTableWidgetItem(short_image))
-
-                                # Container ID (shortened)
-                                short_id = container_id[:12] if container_id else 'N/A'
-                                self.services_table.setItem(row, 5, QTableWidgetItem(short_id))
-
-                print(f"Added {containers_found} containers to table")  # Debug log
-
-                # Resize columns to content
-                self.services_table.resizeColumnsToContents()
-
-                # Show message if no containers found
-                if containers_found == 0:
-                    if "error" in result.stderr.lower() or result.returncode != 0:
-                        self.services_table.setRowCount(1)
-                        self.services_table.setItem(0, 0, QTableWidgetItem("⚠️ Docker Error"))
-                        self.services_table.setItem(0, 1, QTableWidgetItem("🔴 Check Connection"))
-                        self.services_table.setItem(0, 2, QTableWidgetItem("N/A"))
-                        self.services_table.setItem(0, 3, QTableWidgetItem("Run 'docker ps' manually"))
-                        self.services_table.setItem(0, 4, QTableWidgetItem("to troubleshoot"))
-                        self.services_table.setItem(0, 5, QTableWidgetItem("N/A"))
-                    else:
-                        self.services_table.setRowCount(1)
-                        self.services_table.setItem(0, 0, QTableWidgetItem("📦 No Containers"))
-                        self.services_table.setItem(0, 1, QTableWidgetItem("🟡 No Active Services"))
-                        self.services_table.setItem(0, 2, QTableWidgetItem("N/A"))
-                        self.services_table.setItem(0, 3, QTableWidgetItem("Start some services"))
-                        self.services_table.setItem(0, 4, QTableWidgetItem("to see them here"))
-                        self.services_table.setItem(0, 5, QTableWidgetItem("N/A"))
+            store = self.container_store
 
-            else:
+            # Nothing changed since the last render
+            versions = (store.version, self.resource_stats.version)
+            if versions == self.rendered_store_version:
+                return
+            self.rendered_store_version = versions
+
+            if not store.connected:
                 # Show Docker error in table
-                self.services_table.setRowCount(1)
-                self.services_table.setItem(0, 0, QTableWidgetItem("❌ Docker Error"))
-                self.services_table.setItem(0, 1, QTableWidgetItem("🔴 Connection Failed"))
-                self.services_table.setItem(0, 2, QTableWidgetItem("N/A"))
-                self.services_table.setItem(0, 3, QTableWidgetItem(result.stderr[:50]))
-                self.services_table.setItem(0, 4, QTableWidgetItem("Check Docker Desktop"))
-                self.services_table.setItem(0, 5, QTableWidgetItem("N/A"))
-                QMessageBox.warning(self, "Error", f"Failed to get container information:\n{result.stderr}")
+                if store.version == 0:
+                    status_cells = ["⏳ Connecting", "🟡 Waiting for Docker"]
+                else:
+                    status_cells = ["❌ Docker Error", "🔴 Connection Failed"]
+                self.update_table(self.services_model, [
+                    ('__placeholder__', status_cells + ["N/A", store.last_error[:50], "Check Docker Desktop", "N/A"])
+                ])
+                return
+
+            rows = []
+
+            for container in store.snapshot():
+                container_name = container.name
+                status = container.status
+                image = container.image
+                container_id = container.id
+
+                # Map container names to services
+                service_id, service_display_name = self.resolver.resolve(container)
+
+                # Always show the container if it's running, even if not in our services list
+                if service_id or 'Up' in status:
+                    # Service/Container name
+                    display_name = service_display_name if service_id else container_name
+
+                    # Status with color coding
+                    if 'Up' in status:
+                        status_cell = ("🟢 Running", 'green')
+                    elif 'Exited' in status:
+                        status_cell = ("🔴 Stopped", 'red')
+                    else:
+                        status_cell = ("🟡 " + status[:20], 'orange')
+
+                    # Port information
+                    port_info = str(self.services.get(service_id, {}).get('port', 'N/A')) if service_id else 'N/A'
+
+                    # Container name (shortened)
+                    short_name = container_name[:30] + "..." if len(container_name) > 30 else container_name
+
+                    # Image (shortened)
+                    short_image = image[:40] + "..." if len(image) > 40 else image
+
+                    # Container ID (shortened)
+                    short_id = container_id[:12] if container_id else 'N/A'
+
+                    rows.append((container_id, [display_name, status_cell, port_info,
+                                                short_name, short_image, short_id] +
+                                 self.resource_cells(container_id)))
+
+            # Show message if no containers found
+            if not rows:
+                rows.append(('__placeholder__', ["📦 No Containers", "🟡 No Active Services", "N/A",
+                                                 "Start some services", "to see them here", "N/A"]))
+
+            self.update_table(self.services_model, rows)
 
         except Exception as e:
             print(f"Exception in refresh_services_table: {e}")  # Debug log
             # Show error in table
-            self.services_table.setRowCount(1)
-            self.services_table.setItem(0, 0, QTableWidgetItem("❌ Error"))
-            self.services_table.setItem(0, 1, QTableWidgetItem("🔴 Exception"))
-            self.services_table.setItem(0, 2, QTableWidgetItem("N/A"))
-            self.services_table.setItem(0, 3, QTableWidgetItem(str(e)[:30]))
-            self.services_table.setItem(0, 4, QTableWidgetItem("Check console"))
-            self.services_table.setItem(0, 5, QTableWidgetItem("N/A"))
-            QMessageBox.warning(self, "Error", f"Failed to refresh services: {str(e)}")
+            self.rendered_store_version = None
+            self.update_table(self.services_model, [
+                ('__placeholder__', ["❌ Error", "🔴 Exception", "N/A", str(e)[:30], "Check console", "N/A"])
+            ])
+
+    def resource_cells(self, container_id):
+        """Current value of each resource column; the delegates draw the history behind it"""
+        latest = self.resource_stats.latest(container_id)
+        if not latest:
+            return [""] * len(RESOURCE_COLUMNS)
+
+        cells = []
+        for _, field, rate in RESOURCE_COLUMNS:
+            if field == 'cpu_percent':
+                cells.append(f"{latest[field]:.1f}%")
+            elif rate:
+                series = self.resource_stats.series(container_id, field, rate=True)
+                cells.append(f"{format_bytes(series[-1] if len(series) else 0)}/s")
+            else:
+                cells.append(format_bytes(latest[field]))
+        return cells
 
     def load_service_logs(self):
-        """Load logs for the selected service"""
+        """Start streaming logs for the selected service"""
+        self.stop_log_stream()
+        self.logs_text.clear()
+
         service_name = self.log_service_combo.currentText()
         if service_name == "Select a service...":
-            self.logs_text.clear()
             return
 
-        # Find the actual container name
-        container_name = None
+        container_name = self.log_container_for_service(service_name)
+        if not container_name:
+            self.logs_text.setPlainText(f"Container not found for service: {service_name}")
+            return
+
+        tail_lines = self.tail_lines_combo.currentText()
+        tail = 'all' if tail_lines == "All" else tail_lines
+
+        worker = LogStreamWorker(container_name, tail=tail,
+                                 follow=self.follow_logs_checkbox.isChecked(), parent=self)
+        worker.stream_error.connect(lambda message: self.logs_text.appendPlainText(f"Error: {message}"))
+        worker.finished.connect(lambda: self.on_log_stream_finished(worker))
+        self.log_worker = worker
+        worker.start()
+        self.log_flush_timer.start()
+
+    def log_container_for_service(self, service_name):
+        """Find the container name behind a service display name"""
         for service_id, service_info in self.services.items():
             if service_info['name'] == service_name:
-                # Map service names to container names
-                container_mapping = {
-                    'Ollama': 'ollama',
-                    'N8N': 'n8n',
-                    'Twenty CRM': 'twenty',
-                    'Typebot': 'typebot',
-                    'Flask ML API': 'flask_ml_api',
-                    'Portainer': 'portainer'
-                }
-                container_name = container_mapping.get(service_name, service_id)
-                break
+                containers = self.resolver.containers_for(service_id, self.container_store.snapshot())
+                return containers[0].name if containers else service_id
+        return None
 
-        if not container_name:
-            self.logs_text.setPlainText(f"Container not found for service: {service_name}")
+    def flush_log_buffer(self):
+        """Append lines buffered by the log stream in one batch"""
+        if not self.log_worker:
             return
 
-        try:
-            tail_lines = self.tail_lines_combo.currentText()
-            if tail_lines == "All":
-                tail_param = ""
-            else:
-                tail_param = f"--tail {tail_lines}"
+        lines, dropped = self.log_worker.drain()
+        if not lines and not dropped:
+            return
 
-            result = subprocess.run(['docker', 'logs', tail_param, container_name],
-                                  capture_output=True, text=True, timeout=15)
+        scrollbar = self.logs_text.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 4
+
+        if dropped:
+            self.logs_text.appendPlainText(f"... {dropped} lines skipped ...")
+        if lines:
+            self.logs_text.appendPlainText('\n'.join(lines))
+
+        # Only follow the tail if the user has not scrolled up
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+
+    def on_log_stream_finished(self, worker):
+        """Flush whatever is left once a (non-follow) stream ends"""
+        if worker is self.log_worker:
+            self.flush_log_buffer()
+            self.log_flush_timer.stop()
+            self.log_worker = None
+        worker.deleteLater()
+
+    def update_log_collectors(self):
+        """Follow logs of every running service container into the search index"""
+        if not self.log_index_writer:
+            return
 
-            if result.returncode == 0:
-                self.logs_text.setPlainText(result.stdout)
-                self.logs_text.moveCursor(self.logs_text.textCursor().End)
-            else:
-                self.logs_text.setPlainText(f"Error getting logs: {result.stderr}")
+        running = {container.name for container in self.container_store.snapshot()
+                   if container.running and self.resolver.resolve(container)[0]}
+
+        for container_name, collector in list(self.log_collectors.items()):
+            if collector.isFinished() or container_name not in running:
+                collector.stop()
+                if collector.isFinished():
+                    del self.log_collectors[container_name]
+                    collector.deleteLater()
+
+        for container_name in running:
+            if container_name not in self.log_collectors:
+                collector = LogCollector(self.log_index_writer, container_name, self)
+                self.log_collectors[container_name] = collector
+                collector.start()
+
+    def search_logs(self):
+        """Search the log index in the background"""
+        if not self.log_index:
+            self.log_search_results.setPlainText("Log search is unavailable (index could not be opened).")
+            return
 
-        except Exception as e:
-            self.logs_text.setPlainText(f"Error: {str(e)}")
+        text = self.log_search_input.text().strip()
+        levels = LOG_LEVEL_FILTERS[self.log_level_combo.currentText()]
+        window = LOG_TIME_RANGES[self.log_time_combo.currentText()]
+        since = time.time() - window if window else None
 
-    def start_all_services(self):
-        """Start all services"""
-        try:
-            result = subprocess.run(['docker-compose', 'up', '-d'],
-                                 cwd=os.path.dirname(__file__), capture_output=True, text=True)
+        containers = None
+        if self.log_scope_combo.currentText() == "Selected service":
+            container_name = self.log_container_for_service(self.log_service_combo.currentText())
+            if not container_name:
+                self.log_search_results.setPlainText("Select a service first, or search all services.")
+                return
+            containers = [container_name]
 
-            if result.returncode == 0:
-                QMessageBox.information(self, "Success", "All services started successfully!")
-                self.refresh_all_data()
-            else:
-                QMessageBox.warning(self, "Error", f"Failed to start services:\n{result.stderr}")
+        search = functools.partial(self.log_index.search, text, regex=self.log_regex_checkbox.isChecked(),
+                                   levels=levels, containers=containers, since=since,
+                                   limit=LOG_SEARCH_LIMIT)
 
-        except subprocess.CalledProcessError as e:
-            QMessageBox.warning(self, "Error", f"Failed to start services: {e}")
+        def on_finished(result):
+            if isinstance(result, Exception):
+                self.log_search_results.setPlainText(f"Search failed: {result}")
+                return
+            lines = [f"{datetime.fromtimestamp(ts):%Y-%m-%d %H:%M:%S} {container:<20} {line}"
+                     for container, ts, level, line in result]
+            self.log_search_results.setPlainText('\n'.join(lines) if lines else "No matching lines.")
+            self.status_bar.showMessage(f"{len(lines)} matching log lines", 5000)
+
+        self.job_executor.submit('log_search', search, on_finished)
+
+    def stop_log_stream(self, wait=False):
+        """Stop the current log stream, if any"""
+        worker, self.log_worker = self.log_worker, None
+        self.log_flush_timer.stop()
+        if worker:
+            worker.stop()
+            if wait:
+                worker.wait(2000)
+
+    def start_all_services(self):
+        """Start all services"""
+        self.run_docker_command(['docker-compose', 'up', '-d'],
+                                "All services started successfully!",
+                                "Failed to start services",
+                                timeout=COMPOSE_TIMEOUT)
 
     def stop_all_services(self):
         """Stop all services"""
-        try:
-            result = subprocess.run(['docker-compose', 'down'],
-                                 cwd=os.path.dirname(__file__), capture_output=True, text=True)
-
-            if result.returncode == 0:
-                QMessageBox.information(self, "Success", "All services stopped successfully!")
-                self.refresh_all_data()
-            else:
-                QMessageBox.warning(self, "Error", f"Failed to stop services:\n{result.stderr}")
-
-        except subprocess.CalledProcessError as e:
-            QMessageBox.warning(self, "Error", f"Failed to stop services: {e}")
+        self.run_docker_command(['docker-compose', 'down'],
+                                "All services stopped successfully!",
+                                "Failed to stop services",
+                                timeout=COMPOSE_TIMEOUT)
 
     def restart_all_services(self):
         """Restart all services"""
-        try:
-            result = subprocess.run(['docker-compose', 'restart'],
-                                 cwd=os.path.dirname(__file__), capture_output=True, text=True)
-
-            if result.returncode == 0:
-                QMessageBox.information(self, "Success", "All services restarted successfully!")
-                self.refresh_all_data()
-            else:
-                QMessageBox.warning(self, "Error", f"Failed to restart services:\n{result.stderr}")
-
-        except subprocess.CalledProcessError as e:
-            QMessageBox.warning(self, "Error", f"Failed to restart services: {e}")
+        self.run_docker_command(['docker-compose', 'restart'],
+                                "All services restarted successfully!",
+                                "Failed to restart services",
+                                timeout=COMPOSE_TIMEOUT)
 
     def start_selected_service(self):
         """Start the selected service"""
-        self.execute_service_action('up', 'd')
+        self.execute_service_action('up', '-d')
 
     def stop_selected_service(self):
         """Stop the selected service"""
@@ -1178,13 +1287,25 @@ class DockerComposeManager(QMainWindow):
 
     def execute_service_action(self, action, *args):
         """Execute a docker-compose action on the selected service"""
-        current_row = self.services_table.currentRow()
+        current_row = self.services_table.currentIndex().row()
         if current_row == -1:
             QMessageBox.warning(self, "Warning", "Please select a service first.")
             return
 
-        service_name = self.services_table.item(current_row, 0).text()
-        container_name = self.services_table.item(current_row, 3).text()
+        service_name = self.services_model.cell_text(current_row, 0)
+        container = self.container_store.get(self.services_model.key_at(current_row))
+
+        # Containers started by compose know their own file and service name
+        if container and container.compose_service:
+            compose_files = [f for f in container.compose_files if f in self.get_compose_files()]
+            if compose_files:
+                cmd = (['docker-compose', '-f', compose_files[0], action] + list(args) +
+                       [container.compose_service])
+                self.run_docker_command(cmd,
+                                        f"Service {service_name} {action}ed successfully!",
+                                        f"Failed to {action} service {service_name}",
+                                        timeout=COMPOSE_TIMEOUT)
+                return
 
         # Map display names to actual docker-compose service names
         service_name_mapping = {
@@ -1198,18 +1319,30 @@ class DockerComposeManager(QMainWindow):
 
         actual_service_name = service_name_mapping.get(service_name, service_name.lower())
 
-        try:
-            cmd = ['docker-compose', action] + list(args) + [actual_service_name]
-            result = subprocess.run(cmd, cwd=os.path.dirname(__file__), capture_output=True, text=True)
-
-            if result.returncode == 0:
-                QMessageBox.information(self, "Success", f"Service {service_name} {action}ed successfully!")
+        cmd = ['docker-compose', action] + list(args) + [actual_service_name]
+        self.run_docker_command(cmd,
+                                f"Service {service_name} {action}ed successfully!",
+                                f"Failed to {action} service {service_name}",
+                                timeout=COMPOSE_TIMEOUT)
+
+    def run_docker_command(self, cmd, success_message, failure_message, timeout=COMMAND_TIMEOUT):
+        """Run a docker/docker-compose command in the background and report the outcome"""
+        def on_finished(result):
+            if isinstance(result, Exception):
+                QMessageBox.warning(self, "Error", f"{failure_message}: {result}")
+            elif result.returncode == 0:
+                self.status_bar.showMessage(success_message, 5000)
+                QMessageBox.information(self, "Success", success_message)
                 self.refresh_all_data()
             else:
-                QMessageBox.warning(self, "Error", f"Failed to {action} service {service_name}:\n{result.stderr}")
+                self.status_bar.showMessage(failure_message, 5000)
+                QMessageBox.warning(self, "Error", f"{failure_message}:\n{result.stderr}")
 
-        except subprocess.CalledProcessError as e:
-            QMessageBox.warning(self, "Error", f"Failed to {action} service {service_name}: {e}")
+        if self.job_executor.submit_command(cmd, on_finished, cwd=os.path.dirname(__file__),
+                                            timeout=timeout):
+            self.status_bar.showMessage(f"Running: {' '.join(cmd)}")
+        else:
+            self.status_bar.showMessage(f"Already running: {' '.join(cmd)}", 3000)
 
     def open_service_url(self, url):
         """Open a service URL in the internal browser"""
@@ -1241,15 +1374,18 @@ class DockerComposeManager(QMainWindow):
 
     def open_docker_desktop(self):
         """Open Docker Desktop"""
-        try:
-            if sys.platform == "win32":
-                subprocess.run(['start', 'docker-desktop:'], shell=True)
-            elif sys.platform == "darwin":
-                subprocess.run(['open', '-a', 'Docker Desktop'])
-            else:
-                subprocess.run(['xdg-open', 'docker-desktop://'])
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Failed to open Docker Desktop: {e}")
+        if sys.platform == "win32":
+            cmd = ['cmd', '/c', 'start', 'docker-desktop:']
+        elif sys.platform == "darwin":
+            cmd = ['open', '-a', 'Docker Desktop']
+        else:
+            cmd = ['xdg-open', 'docker-desktop://']
+
+        def on_finished(result):
+            if isinstance(result, Exception):
+                QMessageBox.warning(self, "Error", f"Failed to open Docker Desktop: {result}")
+
+        self.job_executor.submit_command(cmd, on_finished, timeout=30)
 
     def change_refresh_interval(self):
         """Change the auto-refresh interval"""
@@ -1258,16 +1394,25 @@ class DockerComposeManager(QMainWindow):
         self.refresh_timer.start(interval * 1000)
 
     def show_system_info(self):
-        """Show system information dialog"""
-        try:
-            # Get Docker version
-            docker_result = subprocess.run(['docker', '--version'],
-                                         capture_output=True, text=True, timeout=5)
+        """Collect tool versions in the background, then show the dialog"""
+        def get_versions():
+            # Get Docker and Docker Compose versions
+            return (subprocess.run(['docker', '--version'],
+                                   capture_output=True, text=True, timeout=5),
+                    subprocess.run(['docker-compose', '--version'],
+                                   capture_output=True, text=True, timeout=5))
+
+        def on_finished(result):
+            if isinstance(result, Exception):
+                QMessageBox.warning(self, "Error", f"Failed to get system information: {result}")
+            else:
+                self.show_system_info_dialog(*result)
 
-            # Get Docker Compose version
-            compose_result = subprocess.run(['docker-compose', '--version'],
-                                          capture_output=True, text=True, timeout=5)
+        self.job_executor.submit('system_info', get_versions, on_finished)
 
+    def show_system_info_dialog(self, docker_result, compose_result):
+        """Show system information dialog"""
+        try:
             # Get system info
             info = "=== System Information ===\n\n"
             info += f"Python Version: {sys.version}\n"
@@ -1277,36 +1422,16 @@ class DockerComposeManager(QMainWindow):
 
             # Get Docker Compose files
             info += "=== Available Services ===\n"
-            compose_files = [f for f in os.listdir(os.path.dirname(__file__))
-                           if f.startswith('docker-compose') and f.endswith('.yml')]
+            compose_files = self.get_compose_files()
 
             if compose_files:
                 info += f"Found {len(compose_files)} docker-compose files:\n"
-                for file in sorted(compose_files):
+                for file in compose_files:
                     info += f"  • {file}\n"
 
-                    # Try to parse services from each compose file
-                    try:
-                        compose_path = os.path.join(os.path.dirname(__file__), file)
-                        with open(compose_path, 'r') as f:
-                            content = f.read()
-                            # Simple parsing to find services
-                            lines = content.split('\n')
-                            services = []
-                            in_services = False
-                            for line in lines:
-                                line = line.strip()
-                                if line == 'services:':
-                                    in_services = True
-                                elif in_services and line.endswith(':') and not line.startswith('  '):
-                                    services.append(line[:-1])
-                                elif in_services and line == '' and services:
-                                    break
-
-                            if services:
-                                info += f"    Services: {', '.join(services)}\n"
-                    except:
-                        pass
+                    services = self.get_compose_services(file)
+                    if services:
+                        info += f"    Services: {', '.join(services)}\n"
                     info += "\n"
             else:
                 info += "No docker-compose files found.\n"
@@ -1336,6 +1461,18 @@ class DockerComposeManager(QMainWindow):
             if hasattr(self, 'monitoring_thread'):
                 self.monitoring_thread.stop()
                 self.monitoring_thread.wait()
+            self.resource_monitor.stop()
+            self.resource_monitor.wait()
+            self.stop_log_stream(wait=True)
+            for collector in self.log_collectors.values():
+                collector.stop()
+            for collector in self.log_collectors.values():
+                collector.wait(2000)
+            if self.log_index_writer:
+                self.log_index_writer.stop()
+                self.log_index_writer.wait()
+                self.log_index.close()
+            self.job_executor.shutdown()
             event.accept()
         else:
             event.ignore()
@@ -1355,83 +1492,461 @@ class DockerComposeManager(QMainWindow):
                          "Built with PyQt5 and Docker Compose")
 
 
+class KeyedTableModel(QAbstractTableModel):
+    """Table model whose rows are identified by a stable key (e.g. container ID).
+
+    update_rows() diffs the new rows against the current ones and emits
+    rowsRemoved/rowsInserted/rowsMoved/dataChanged only where something
+    actually changed, so views keep their selection and never flicker.
+    Cells are plain strings or (text, color) tuples.
+    """
+
+    def __init__(self, headers, parent=None):
+        super().__init__(parent)
+        self.headers = headers
+        self.keys = []
+        self.rows = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.keys)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        cell = self.rows[self.keys[index.row()]][index.column()]
+        text, color = cell if isinstance(cell, tuple) else (cell, None)
+        if role == Qt.DisplayRole:
+            return text
+        if role == Qt.ForegroundRole and color:
+            return QColor(color)
+        return None
+
+    def cell_text(self, row, column):
+        """Display text of a cell, or None for an invalid row"""
+        if not 0 <= row < len(self.keys):
+            return None
+        cell = self.rows[self.keys[row]][column]
+        return cell[0] if isinstance(cell, tuple) else cell
+
+    def key_at(self, row):
+        """Key of the given row, or None for an invalid row"""
+        return self.keys[row] if 0 <= row < len(self.keys) else None
+
+    def update_rows(self, new_rows):
+        """Apply an ordered list of (key, cells); returns True if rows were added or removed"""
+        new_keys = [key for key, _ in new_rows]
+        new_key_set = set(new_keys)
+        structure_changed = False
+
+        # Drop rows whose key disappeared, bottom-up so indexes stay valid
+        for row in range(len(self.keys) - 1, -1, -1):
+            if self.keys[row] not in new_key_set:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self.rows[self.keys.pop(row)]
+                self.endRemoveRows()
+                structure_changed = True
+
+        for row, (key, cells) in enumerate(new_rows):
+            # Placeholder rows may leave trailing columns out
+            cells = tuple(cells) + ('',) * (len(self.headers) - len(cells))
+            if row < len(self.keys) and self.keys[row] == key:
+                if self.rows[key] != cells:
+                    changed = [c for c in range(len(cells)) if self.rows[key][c] != cells[c]]
+                    self.rows[key] = cells
+                    self.dataChanged.emit(self.index(row, changed[0]), self.index(row, changed[-1]))
+            elif key in self.rows:
+                # Existing row further down: move it up into place
+                source = self.keys.index(key)
+                self.beginMoveRows(QModelIndex(), source, source, QModelIndex(), row)
+                self.keys.insert(row, self.keys.pop(source))
+                self.endMoveRows()
+                if self.rows[key] != cells:
+                    self.rows[key] = cells
+                    self.dataChanged.emit(self.index(row, 0), self.index(row, len(cells) - 1))
+            else:
+                self.beginInsertRows(QModelIndex(), row, row)
+                self.keys.insert(row, key)
+                self.rows[key] = cells
+                self.endInsertRows()
+                structure_changed = True
+
+        return structure_changed
+
+
+class SparklineDelegate(QStyledItemDelegate):
+    """Draws a container's recent resource history behind the cell's current value"""
+
+    def __init__(self, resource_stats, field, rate=False, parent=None):
+        super().__init__(parent)
+        self.resource_stats = resource_stats
+        self.field = field
+        self.rate = rate
+
+    def paint(self, painter, option, index):
+        container_id = index.model().key_at(index.row())
+        series = self.resource_stats.series(container_id, self.field, rate=self.rate)
+        if len(series) >= 2:
+            # CPU is plotted against 100% of one core, memory against its limit
+            if self.field == 'cpu_percent':
+                ceiling = max(100.0, series.max())
+            elif self.field == 'mem_usage':
+                latest = self.resource_stats.latest(container_id) or {}
+                ceiling = max(latest.get('mem_limit', 0), series.max())
+            else:
+                ceiling = series.max()
+            ceiling = ceiling or 1.0
+
+            rect = option.rect.adjusted(2, 3, -2, -3)
+            step = rect.width() / (len(series) - 1)
+            points = QPolygonF([QPointF(rect.left() + i * step, rect.bottom() - value / ceiling * rect.height())
+                                for i, value in enumerate(series)])
+            painter.save()
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setPen(QPen(QColor('#81a1c1'), 1))
+            painter.drawPolyline(points)
+            painter.restore()
+
+        super().paint(painter, option, index)
+
+
+class JobSignals(QObject):
+    """Signals for a background job (QRunnable cannot emit signals itself)"""
+    finished = pyqtSignal(object, object)
+
+
+class BackgroundJob(QRunnable):
+    """Runs a callable on the thread pool and emits its result or exception"""
+
+    def __init__(self, key, fn):
+        super().__init__()
+        self.key = key
+        self.fn = fn
+        self.signals = JobSignals()
+
+    def run(self):
+        try:
+            result = self.fn()
+        except Exception as e:
+            result = e
+        self.signals.finished.emit(self.key, result)
+
+
+class JobExecutor(QObject):
+    """Bounded pool for blocking work, with results delivered on the GUI thread.
+
+    Jobs are identified by a key; submitting a key that is already queued or
+    running is dropped, so repeated clicks or refresh ticks never pile up.
+    """
+
+    def __init__(self, max_workers=MAX_BACKGROUND_JOBS, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_workers)
+        self.pending = {}
+
+    def submit(self, key, fn, callback=None):
+        """Queue fn() and call callback(result) on the GUI thread; False if a duplicate"""
+        if key in self.pending:
+            return False
+
+        job = BackgroundJob(key, fn)
+        # The signals object lives on the GUI thread, so this connection is queued
+        job.signals.finished.connect(self._on_finished)
+        self.pending[key] = (job, callback)
+        self.pool.start(job)
+        return True
+
+    def submit_command(self, cmd, callback=None, cwd=None, timeout=COMMAND_TIMEOUT):
+        """Queue a CLI command; callback receives the CompletedProcess or the exception"""
+        key = (tuple(cmd), cwd)
+        return self.submit(key, lambda: subprocess.run(cmd, cwd=cwd, capture_output=True,
+                                                       text=True, timeout=timeout),
+                           callback)
+
+    def is_pending(self, key):
+        """Check whether a job with this key is queued or running"""
+        return key in self.pending
+
+    def _on_finished(self, key, result):
+        _, callback = self.pending.pop(key, (None, None))
+        if callback:
+            callback(result)
+
+    def shutdown(self, wait_ms=3000):
+        """Drop queued jobs and give running ones a moment to finish"""
+        self.pool.clear()
+        self.pool.waitForDone(wait_ms)
+
+
+class LogStreamWorker(QThread):
+    """Thread that streams one container's logs into a bounded ring buffer.
+
+    The GUI drains the buffer on a timer and appends in batches; if it falls
+    behind, the oldest undrained lines are dropped and counted instead of
+    letting memory grow.
+    """
+    stream_error = pyqtSignal(str)
+
+    def __init__(self, container_name, tail='all', follow=True,
+                 capacity=LOG_BUFFER_LINES, parent=None):
+        super().__init__(parent)
+        self.container_name = container_name
+        self.tail = tail
+        self.follow = follow
+        self.buffer = deque(maxlen=capacity)
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.running = True
+        self.log_stream = None
+
+    def run(self):
+        """Read lines until the stream ends or stop() is called"""
+        try:
+            self.log_stream = open_log_stream(self.container_name, follow=self.follow, tail=self.tail)
+            if not self.running:
+                return
+            for line in self.log_stream:
+                if not self.running:
+                    break
+                with self.lock:
+                    if len(self.buffer) == self.buffer.maxlen:
+                        self.dropped += 1
+                    self.buffer.append(line)
+        except Exception as e:
+            if self.running:
+                self.stream_error.emit(str(e))
+        finally:
+            self.close_log_stream()
+
+    def drain(self):
+        """Take all buffered lines and the number dropped since the last drain"""
+        with self.lock:
+            lines = list(self.buffer)
+            self.buffer.clear()
+            dropped, self.dropped = self.dropped, 0
+        return lines, dropped
+
+    def close_log_stream(self):
+        """Close the log stream if it is still open"""
+        stream, self.log_stream = self.log_stream, None
+        if stream:
+            stream.close()
+
+    def stop(self):
+        """Stop streaming"""
+        self.running = False
+        # Unblock the thread if it is waiting for the next line
+        self.close_log_stream()
+
+
+class LogIndexWriter(QThread):
+    """Single writer thread that batches collected log lines into the search index"""
+
+    def __init__(self, log_index, parent=None):
+        super().__init__(parent)
+        self.log_index = log_index
+        self.queue = queue.Queue(maxsize=LOG_INDEX_QUEUE_LINES)
+        self.running = True
+
+    def put(self, container_name, line):
+        """Queue a line for indexing; dropped if the writer is far behind"""
+        try:
+            self.queue.put_nowait((container_name, line))
+        except queue.Full:
+            pass
+
+    def run(self):
+        """Flush queued lines at least once a second"""
+        while self.running:
+            batches = {}
+            deadline = time.monotonic() + 1.0
+            while time.monotonic() < deadline:
+                try:
+                    container_name, line = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                batches.setdefault(container_name, []).append(line)
+
+            for container_name, lines in batches.items():
+                try:
+                    self.log_index.add_lines(container_name, lines)
+                except Exception as e:
+                    print(f"Log index error: {e}")
+
+    def stop(self):
+        """Stop the writer thread"""
+        self.running = False
+
+
+class LogCollector(QThread):
+    """Thread that follows one container's logs into the index writer"""
+
+    def __init__(self, writer, container_name, parent=None):
+        super().__init__(parent)
+        self.writer = writer
+        self.container_name = container_name
+        self.running = True
+        self.log_stream = None
+
+    def run(self):
+        """Resume from the newest indexed line and follow until the container stops"""
+        try:
+            since = self.writer.log_index.last_timestamp(self.container_name)
+            if since is None:
+                self.log_stream = open_log_stream(self.container_name, follow=True,
+                                                  tail=LOG_INDEX_INITIAL_LINES, timestamps=True)
+            else:
+                self.log_stream = open_log_stream(self.container_name, follow=True,
+                                                  timestamps=True, since=since + 1e-6)
+            if not self.running:
+                return
+            for line in self.log_stream:
+                if not self.running:
+                    break
+                self.writer.put(self.container_name, line)
+        except Exception as e:
+            if self.running:
+                print(f"Log collector error for {self.container_name}: {e}")
+        finally:
+            self.close_log_stream()
+
+    def close_log_stream(self):
+        """Close the log stream if it is still open"""
+        stream, self.log_stream = self.log_stream, None
+        if stream:
+            stream.close()
+
+    def stop(self):
+        """Stop collecting"""
+        self.running = False
+        self.close_log_stream()
+
+
 class ContainerMonitor(QThread):
-    """Thread for monitoring container status"""
+    """Thread that keeps the shared container store in sync with Docker events"""
     status_updated = pyqtSignal(dict)
+    store_changed = pyqtSignal()
 
-    def __init__(self, parent=None):
+    def __init__(self, store, resolver, parent=None):
         super().__init__(parent)
+        self.store = store
+        self.resolver = resolver
         self.running = True
+        self.event_stream = None
 
     def run(self):
-        """Monitor container status in a loop"""
+        """Resync once, then apply `docker events` deltas until the stream ends"""
         while self.running:
             try:
-                # Get container status with more detailed format
-                result = subprocess.run(['docker', 'ps', '-a', '--format',
-                                       '{{.Names}}\t{{.Status}}\t{{.Ports}}'],
-                                      capture_output=True, text=True, timeout=10)
-
-                if result.returncode == 0:
-                    status_data = {}
-                    lines = result.stdout.strip().split('\n')
-
-                    for line in lines:
-                        if line.strip():
-                            parts = line.split('\t')
-                            if len(parts) >= 2:
-                                container_name = parts[0]
-                                status = parts[1]
-                                ports = parts[2] if len(parts) > 2 else ''
-
-                                # Determine service status
-                                service_status = 'stopped'
-                                if 'Up' in status:
-                                    service_status = 'running'
-                                elif 'Exited' in status:
-                                    service_status = 'stopped'
-
-                                # Map container names to service IDs with improved logic
-                                service_mapping = {
-                                    'twenty': 'twenty',
-                                    'typebot': 'typebot',
-                                    'portainer': 'portainer',
-                                    'portainer_demoforge': 'portainer',
-                                    'ollama': 'ollama',
-                                    'n8n': 'n8n',
-                                    'flask_ml_api': 'bentoml',
-                                    'postgres_n8n': 'postgres_n8n',
-                                    'postgres_twenty': 'postgres_twenty',
-                                    'redis': 'redis',
-                                    'mongo': 'mongo'
-                                }
-
-                                # Check for matches
-                                for container_key, service_id in service_mapping.items():
-                                    if container_key in container_name.lower():
-                                        status_data[service_id] = service_status
-                                        break
-                                else:
-                                    # If no mapping found, try to match with service IDs directly
-                                    for service_id in ['ollama', 'n8n', 'twenty', 'typebot', 'bentoml', 'portainer']:
-                                        if service_id in container_name.lower():
-                                            status_data[service_id] = service_status
-                                            break
-
-                    self.status_updated.emit(status_data)
+                # Subscribe before listing so no event between the two is lost
+                self.event_stream = open_event_stream()
+                self.store.resync(list_containers())
+                self.publish()
+
+                for event in self.event_stream:
+                    if not self.running:
+                        break
+                    try:
+                        if self.store.apply_event(event):
+                            self.publish()
+                    except Exception as e:
+                        print(f"Monitoring error: {e}")
+
+                if self.running and self.store.set_disconnected("Docker event stream closed"):
+                    self.publish()
 
             except Exception as e:
+                if not self.running:
+                    break
                 print(f"Monitoring error: {e}")
+                if self.store.set_disconnected(str(e)):
+                    self.publish()
+            finally:
+                self.close_event_stream()
 
-            # Wait 5 seconds before next check
+            # Wait 5 seconds before reconnecting
             for _ in range(50):  # 5 seconds * 10 = 50 iterations of 100ms
                 if not self.running:
                     break
                 time.sleep(0.1)
 
+    def publish(self):
+        """Notify the GUI that the store changed"""
+        self.status_updated.emit(self.service_status())
+        self.store_changed.emit()
+
+    def service_status(self):
+        """Map containers in the store to dashboard service states"""
+        return self.resolver.statuses(self.store.snapshot())
+
+    def close_event_stream(self):
+        """Close the event stream if it is still open"""
+        stream, self.event_stream = self.event_stream, None
+        if stream:
+            stream.close()
+
     def stop(self):
         """Stop the monitoring thread"""
         self.running = False
+        # Unblock the thread if it is waiting on the event stream
+        self.close_event_stream()
+
+
+class ResourceMonitor(QThread):
+    """Thread that follows resource usage of all running containers over one stats stream"""
+    samples_updated = pyqtSignal()
+
+    def __init__(self, container_store, resource_stats, parent=None):
+        super().__init__(parent)
+        self.container_store = container_store
+        self.resource_stats = resource_stats
+        self.running = True
+
+    def run(self):
+        """Poll the stats stream, announcing new samples at most once a second"""
+        while self.running:
+            stats_stream = None
+            try:
+                stats_stream = open_stats_stream()
+                last_emit = 0
+                while self.running:
+                    containers = self.container_store.snapshot()
+                    stats_stream.track({c.id for c in containers if c.running})
+                    for container_id, sample in stats_stream.poll(1.0):
+                        self.resource_stats.add(container_id, sample)
+                    self.resource_stats.retain({c.id for c in containers})
+
+                    if time.monotonic() - last_emit >= 1.0:
+                        last_emit = time.monotonic()
+                        self.samples_updated.emit()
+            except EngineStatsRejected as e:
+                # open_stats_stream() now returns the CLI stream; switch at once
+                print(f"Engine API stats unavailable, using docker stats: {e}")
+                continue
+            except Exception as e:
+                if self.running:
+                    print(f"Resource monitor error: {e}")
+            finally:
+                if stats_stream:
+                    stats_stream.close()
+
+            # Wait 5 seconds before reconnecting
+            for _ in range(50):
+                if not self.running:
+                    break
+                time.sleep(0.1)
+
+    def stop(self):
+        """Stop the resource monitor; it exits within one poll interval"""
+        self.running = False
 
 
 def main():
@@ -0,0 +1,66 @@
+"""
+Gunicorn configuration for flask_ml_service
+Pre-forks one worker per available core; the model is loaded once in the
+master (preload_app). Its flat_forest arrays are memory-mapped; the sklearn
+trees live on the master's heap and reach the workers copy-on-write, so
+touching them can still copy pages into each worker
+"""
+import os
+import tempfile
+
+host = os.environ.get('HOST', '0.0.0.0')
+port = int(os.environ.get('PORT', 5002))
+bind = f"{host}:{port}"
+
+
+def default_workers():
+    """Cores this container may actually use, not the host's total"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+workers = int(os.environ.get('WEB_CONCURRENCY') or default_workers())
+preload_app = True
+
+# Threads let concurrent requests in one worker be micro-batched into a single model call
+worker_class = 'gthread'
+threads = int(os.environ.get('THREADS', 8))
+
+# On SIGTERM, stop accepting and give in-flight requests this long to finish
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', 30))
+timeout = int(os.environ.get('WORKER_TIMEOUT', 60))
+keepalive = 5
+
+# Recycle workers now and then so slow leaks cannot build up
+max_requests = int(os.environ.get('MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get('ACCESS_LOG') or None
+errorlog = '-'
+
+# Workers pool their Prometheus metrics through snapshot files (see service_metrics.py);
+# set before the app is preloaded, which creates the registry
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), f"flask_ml_metrics_{port}"))
+
+
+def on_starting(server):
+    from service_metrics import REGISTRY
+    REGISTRY.clear()
+
+
+def post_fork(server, worker):
+    from service_metrics import REGISTRY
+    REGISTRY.start_flusher()
+
+
+def worker_exit(server, worker):
+    from service_metrics import REGISTRY
+    REGISTRY.flush()
+
+
+def child_exit(server, worker):
+    # Keep the counts of recycled or crashed workers
+    from service_metrics import REGISTRY
+    REGISTRY.fold(worker.pid)
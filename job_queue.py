@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Offline Scoring Jobs
+Persistent SQLite job queue plus a pool of worker processes that score
+dataset files in fixed-size chunks and record progress as they go
+"""
+import multiprocessing
+import os
+import signal
+import sqlite3
+import threading
+import time
+import uuid
+
+from stream_formats import ARROW, CSV, NDJSON, ChunkEncoder, available_stream_media_types, iter_row_chunks
+
+JOB_DATA_DIR = os.environ.get('JOB_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+JOBS_DB = os.environ.get('JOBS_DB', os.path.join(JOB_DATA_DIR, 'jobs.db'))
+JOB_CHUNK_ROWS = int(os.environ.get('JOB_CHUNK_ROWS', 50000))
+IDLE_POLL_SECONDS = 1.0
+
+# Dataset formats by file extension
+EXTENSIONS = {
+    '.csv': CSV,
+    '.ndjson': NDJSON, '.jsonl': NDJSON,
+    '.arrow': ARROW, '.arrows': ARROW
+}
+OUTPUT_EXTENSIONS = {CSV: '.csv', NDJSON: '.ndjson', ARROW: '.arrow'}
+
+JOB_COLUMNS = ('id', 'status', 'input_path', 'output_path', 'chunk_rows', 'input_bytes',
+               'bytes_read', 'rows_done', 'rows_per_second', 'error', 'submitted_at',
+               'started_at', 'finished_at')
+
+
+class JobError(Exception):
+    """A job request that cannot be accepted"""
+
+
+def dataset_format(path):
+    """Media type of a dataset file, from its extension"""
+    kind = EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if kind not in available_stream_media_types():
+        raise JobError(f"Unsupported dataset type {path}; use one of {', '.join(sorted(EXTENSIONS))}")
+    return kind
+
+
+def resolve_data_path(path, data_dir=JOB_DATA_DIR):
+    """Absolute path inside the data directory; anything outside it is refused"""
+    data_dir = os.path.realpath(data_dir)
+    resolved = os.path.realpath(os.path.join(data_dir, path))
+    if os.path.commonpath([resolved, data_dir]) != data_dir:
+        raise JobError(f"Paths must be inside {data_dir}")
+    return resolved
+
+
+class JobStore:
+    """Job records in SQLite, safe to share between threads and processes"""
+
+    def __init__(self, path=JOBS_DB):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                input_path TEXT NOT NULL,
+                output_path TEXT NOT NULL,
+                chunk_rows INTEGER NOT NULL,
+                input_bytes INTEGER NOT NULL DEFAULT 0,
+                bytes_read INTEGER NOT NULL DEFAULT 0,
+                rows_done INTEGER NOT NULL DEFAULT 0,
+                rows_per_second REAL NOT NULL DEFAULT 0,
+                error TEXT NOT NULL DEFAULT '',
+                worker_pid INTEGER,
+                submitted_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, submitted_at)')
+        self.db.commit()
+
+    @staticmethod
+    def as_dict(row):
+        """Public view of a job row, with progress as a fraction of the input read"""
+        if row is None:
+            return None
+        job = {column: row[column] for column in JOB_COLUMNS}
+        job['progress'] = (1.0 if job['status'] == 'done' else
+                           job['bytes_read'] / job['input_bytes'] if job['input_bytes'] else 0.0)
+        return job
+
+    def submit(self, input_path, output_path=None, chunk_rows=JOB_CHUNK_ROWS):
+        """Queue a dataset file for scoring; results go next to it unless output_path is given.
+
+        Results are written in the format of output_path's extension, which
+        defaults to the input's.
+        """
+        kind = dataset_format(input_path)
+        if not os.path.isfile(input_path):
+            raise JobError(f"Dataset {input_path} not found")
+        if output_path:
+            dataset_format(output_path)
+        chunk_rows = int(chunk_rows)
+        if chunk_rows <= 0:
+            raise JobError(f"chunk_rows must be a positive integer, not {chunk_rows}")
+
+        job_id = uuid.uuid4().hex
+        if not output_path:
+            output_path = f"{os.path.splitext(input_path)[0]}.predictions-{job_id[:8]}{OUTPUT_EXTENSIONS[kind]}"
+        with self.lock, self.db:
+            self.db.execute('''
+                INSERT INTO jobs (id, status, input_path, output_path, chunk_rows, input_bytes, submitted_at)
+                VALUES (?, 'queued', ?, ?, ?, ?, ?)
+            ''', (job_id, input_path, output_path, chunk_rows, os.path.getsize(input_path), time.time()))
+        return self.get(job_id)
+
+    def get(self, job_id):
+        with self.lock:
+            return self.as_dict(self.db.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone())
+
+    def list(self, limit=50):
+        with self.lock:
+            rows = self.db.execute('SELECT * FROM jobs ORDER BY submitted_at DESC LIMIT ?', (limit,)).fetchall()
+        return [self.as_dict(row) for row in rows]
+
+    def claim_next(self):
+        """Mark the oldest queued job as running by this process; None if the queue is empty"""
+        with self.lock:
+            while True:
+                row = self.db.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' ORDER BY submitted_at LIMIT 1").fetchone()
+                if row is None:
+                    return None
+                with self.db:
+                    claimed = self.db.execute('''
+                        UPDATE jobs SET status = 'running', started_at = ?, worker_pid = ?
+                        WHERE id = ? AND status = 'queued'
+                    ''', (time.time(), os.getpid(), row['id'])).rowcount
+                if claimed:
+                    # Another worker may have taken it between the two statements
+                    return self.as_dict(self.db.execute('SELECT * FROM jobs WHERE id = ?',
+                                                        (row['id'],)).fetchone())
+
+    def update(self, job_id, **fields):
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        with self.lock, self.db:
+            self.db.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', list(fields.values()) + [job_id])
+
+    def requeue_running(self):
+        """Put jobs of workers that died mid-run back in the queue"""
+        with self.lock, self.db:
+            return self.db.execute('''
+                UPDATE jobs SET status = 'queued', bytes_read = 0, rows_done = 0, started_at = NULL
+                WHERE status = 'running'
+            ''').rowcount
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+def run_job(store, job, score):
+    """Score one dataset file chunk by chunk, recording progress after every chunk"""
+    kind = dataset_format(job['input_path'])
+    started = time.monotonic()
+    rows_done = 0
+    tmp_path = job['output_path'] + '.part'
+    encoder = ChunkEncoder(dataset_format(job['output_path']))
+
+    try:
+        with open(job['input_path'], 'rb') as source, open(tmp_path, 'wb') as sink:
+            for rows in iter_row_chunks(kind, source, job['chunk_rows']):
+                prediction, probability = score(rows)
+                sink.write(encoder.encode(prediction, probability))
+                rows_done += len(rows)
+                store.update(job['id'], rows_done=rows_done, bytes_read=source.tell(),
+                             rows_per_second=rows_done / max(time.monotonic() - started, 1e-9))
+            sink.write(encoder.close())
+    except Exception:
+        # A failed job leaves no partial output behind
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    os.replace(tmp_path, job['output_path'])
+    store.update(job['id'], status='done', finished_at=time.time(), bytes_read=job['input_bytes'],
+                 rows_per_second=rows_done / max(time.monotonic() - started, 1e-9))
+
+
+def worker_loop(db_path, score, stop_event):
+    """Process jobs until stop_event is set; runs in each worker process"""
+    # The parent decides when to stop; a Ctrl+C in the terminal should not kill a job midway
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    store = JobStore(db_path)
+    try:
+        while not stop_event.is_set():
+            job = store.claim_next()
+            if job is None:
+                stop_event.wait(IDLE_POLL_SECONDS)
+                continue
+            try:
+                run_job(store, job, score)
+            except Exception as e:
+                store.update(job['id'], status='failed', error=str(e), finished_at=time.time())
+    finally:
+        store.close()
+
+
+class JobWorkerPool:
+    """Forked worker processes sharing the parent's already-loaded model"""
+
+    def __init__(self, score, workers=1, db_path=JOBS_DB):
+        self.score = score
+        self.workers = workers
+        self.db_path = db_path
+        # fork, so score() and the model behind it are inherited rather than pickled
+        self.context = multiprocessing.get_context('fork')
+        self.stop_event = self.context.Event()
+        self.processes = []
+
+    def start(self):
+        store = JobStore(self.db_path)
+        requeued = store.requeue_running()
+        store.close()
+        if requeued:
+            print(f"Requeued {requeued} interrupted scoring jobs")
+
+        for i in range(self.workers):
+            process = self.context.Process(target=worker_loop, name=f'scoring-worker-{i}',
+                                           args=(self.db_path, self.score, self.stop_event), daemon=True)
+            process.start()
+            self.processes.append(process)
+
+    def stop(self, timeout=10):
+        """Stop taking jobs; a job still running after timeout is killed and requeued on the next start"""
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run scoring job workers outside the web server")
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('JOB_WORKERS', 1)))
+    args = parser.parse_args()
+
+    from flask_ml_service import run_model
+
+    pool = JobWorkerPool(run_model, workers=args.workers)
+    pool.start()
+    print(f"Scoring job workers running ({args.workers}); queue at {JOBS_DB}")
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGINT, signal.SIGTERM})
+    try:
+        signal.sigwait({signal.SIGINT, signal.SIGTERM})
+    finally:
+        pool.stop()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Container Log Index
+Rolling on-disk SQLite index of recent log lines per container, searchable by
+substring (FTS5 trigram index), regex, level and time range
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+DEFAULT_INDEX_PATH = os.environ.get(
+    'DEMOFORGE_LOG_INDEX', os.path.join(os.path.expanduser('~'), '.demoforge', 'log_index.db'))
+
+# Lines kept per container; older ones are pruned
+MAX_LINES_PER_CONTAINER = 200000
+PRUNE_EVERY = 5000
+
+LEVELS = ['FATAL', 'ERROR', 'WARN', 'INFO', 'DEBUG']
+
+LEVEL_PATTERN = re.compile(
+    r'\b(TRACE|DEBUG|INFO|NOTICE|WARN(?:ING)?|ERR(?:OR)?|CRIT(?:ICAL)?|FATAL|PANIC)\b',
+    re.IGNORECASE)
+
+LEVEL_ALIASES = {
+    'TRACE': 'DEBUG', 'NOTICE': 'INFO', 'WARNING': 'WARN', 'ERR': 'ERROR',
+    'CRIT': 'FATAL', 'CRITICAL': 'FATAL', 'PANIC': 'FATAL'
+}
+
+
+def detect_level(line):
+    """Guess the log level of a line; '' when none is mentioned"""
+    match = LEVEL_PATTERN.search(line[:200])
+    if not match:
+        return ''
+    level = match.group(1).upper()
+    return LEVEL_ALIASES.get(level, level)
+
+
+def split_timestamp(line):
+    """Split a `docker logs --timestamps` line into (epoch seconds, message)"""
+    stamp, _, message = line.partition(' ')
+    if not stamp.endswith('Z') or 'T' not in stamp:
+        return time.time(), line
+
+    base, _, fraction = stamp[:-1].partition('.')
+    try:
+        parsed = datetime.strptime(base, '%Y-%m-%dT%H:%M:%S').replace(tzinfo=timezone.utc)
+    except ValueError:
+        return time.time(), line
+    return parsed.timestamp() + float('0.' + (fraction or '0')), message
+
+
+class LogIndex:
+    """Thread-safe rolling log store with full-text search"""
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, max_lines_per_container=MAX_LINES_PER_CONTAINER):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_lines = max_lines_per_container
+        self.lock = threading.Lock()
+        self.inserts_since_prune = {}
+
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.create_function('REGEXP', 2, self._regexp, deterministic=True)
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS log_lines (
+                id INTEGER PRIMARY KEY,
+                container TEXT NOT NULL,
+                ts REAL NOT NULL,
+                level TEXT NOT NULL,
+                line TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS log_lines_container_ts ON log_lines (container, ts);
+            CREATE INDEX IF NOT EXISTS log_lines_ts ON log_lines (ts);
+        ''')
+        self.fts = self._create_fts()
+
+    def _create_fts(self):
+        """Set up the trigram FTS5 index; False if this SQLite lacks it"""
+        try:
+            self.db.executescript('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS log_fts USING fts5(
+                    line, content='log_lines', content_rowid='id', tokenize='trigram');
+                CREATE TRIGGER IF NOT EXISTS log_lines_ai AFTER INSERT ON log_lines BEGIN
+                    INSERT INTO log_fts (rowid, line) VALUES (new.id, new.line);
+                END;
+                CREATE TRIGGER IF NOT EXISTS log_lines_ad AFTER DELETE ON log_lines BEGIN
+                    INSERT INTO log_fts (log_fts, rowid, line) VALUES ('delete', old.id, old.line);
+                END;
+            ''')
+            return True
+        except sqlite3.OperationalError as e:
+            print(f"Full-text index unavailable, using LIKE scans: {e}")
+            return False
+
+    @staticmethod
+    def _regexp(pattern, value):
+        try:
+            return re.search(pattern, value or '') is not None
+        except re.error:
+            return False
+
+    def add_lines(self, container, lines):
+        """Index raw `docker logs --timestamps` lines for a container"""
+        rows = []
+        for line in lines:
+            ts, message = split_timestamp(line)
+            rows.append((container, ts, detect_level(message), message))
+        if not rows:
+            return
+
+        with self.lock:
+            with self.db:
+                self.db.executemany(
+                    'INSERT INTO log_lines (container, ts, level, line) VALUES (?, ?, ?, ?)', rows)
+            count = self.inserts_since_prune.get(container, 0) + len(rows)
+            if count >= PRUNE_EVERY:
+                self._prune(container)
+                count = 0
+            self.inserts_since_prune[container] = count
+
+    def _prune(self, container):
+        """Keep only the newest max_lines rows of a container"""
+        with self.db:
+            self.db.execute('''
+                DELETE FROM log_lines WHERE container = ? AND id <= (
+                    SELECT id FROM log_lines WHERE container = ?
+                    ORDER BY id DESC LIMIT 1 OFFSET ?)
+            ''', (container, container, self.max_lines))
+
+    def last_timestamp(self, container):
+        """Timestamp of the newest indexed line, so collection can resume from there"""
+        with self.lock:
+            row = self.db.execute('SELECT MAX(ts) FROM log_lines WHERE container = ?',
+                                  (container,)).fetchone()
+        return row[0]
+
+    def search(self, text='', regex=False, levels=None, containers=None,
+               since=None, until=None, limit=1000):
+        """Find lines matching all given filters, newest last.
+
+        text is a plain substring unless regex is True. levels and containers
+        are lists; since/until are epoch seconds.
+        """
+        clauses, params = [], []
+        source = 'log_lines'
+
+        if text and not regex:
+            if self.fts and len(text) >= 3:
+                # Trigram index answers substring queries; quote to search literally
+                source = 'log_lines JOIN log_fts ON log_fts.rowid = log_lines.id'
+                clauses.append('log_fts MATCH ?')
+                params.append('"' + text.replace('"', '""') + '"')
+            else:
+                clauses.append("log_lines.line LIKE ? ESCAPE '\\'")
+                params.append('%' + re.sub(r'([%_\\])', r'\\\1', text) + '%')
+        elif text:
+            re.compile(text)  # raise re.error for the caller instead of matching nothing
+            clauses.append('log_lines.line REGEXP ?')
+            params.append(text)
+
+        if levels:
+            clauses.append(f"log_lines.level IN ({','.join('?' * len(levels))})")
+            params.extend(levels)
+        if containers:
+            clauses.append(f"log_lines.container IN ({','.join('?' * len(containers))})")
+            params.extend(containers)
+        if since is not None:
+            clauses.append('log_lines.ts >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('log_lines.ts <= ?')
+            params.append(until)
+
+        where = ('WHERE ' + ' AND '.join(clauses)) if clauses else ''
+        query = f'''
+            SELECT container, ts, level, line FROM (
+                SELECT log_lines.container, log_lines.ts, log_lines.level, log_lines.line
+                FROM {source} {where}
+                ORDER BY log_lines.ts DESC LIMIT ?
+            ) ORDER BY ts
+        '''
+        with self.lock:
+            return self.db.execute(query, params + [limit]).fetchall()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Adaptive Micro-Batching
+Collects rows from concurrent requests into one ndarray so the model runs
+once per batch instead of once per request
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Queues row blocks from many threads and runs fn on them in batches.
+
+    fn takes a 2D array and returns a tuple of arrays aligned with its rows;
+    each caller gets back the slices for its own rows. A batch closes when
+    it reaches max_batch_size rows or max_latency seconds after its first
+    request. The wait only happens while recent traffic is concurrent, so
+    a lone client never pays the extra latency.
+    """
+
+    def __init__(self, fn, max_batch_size=64, max_latency=0.005):
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.lock = threading.Lock()
+        self.queue = None
+        self.pid = None
+        # Moving average of requests per batch; > 1 means callers overlap
+        self.avg_requests = 1.0
+
+    def _ensure_worker(self):
+        # Threads do not survive fork, so every (gunicorn) worker process starts its own
+        if self.pid == os.getpid():
+            return
+        with self.lock:
+            if self.pid != os.getpid():
+                self.queue = queue.Queue()
+                threading.Thread(target=self._run, args=(self.queue,), daemon=True,
+                                 name='micro-batcher').start()
+                self.pid = os.getpid()
+
+    def submit(self, rows):
+        """Queue a 2D array of rows; returns a Future with fn's result for those rows"""
+        self._ensure_worker()
+        future = Future()
+        self.queue.put((rows, future))
+        return future
+
+    def __call__(self, rows):
+        """Run rows through the batcher and wait; large blocks bypass the queue"""
+        if len(rows) >= self.max_batch_size:
+            return self.fn(rows)
+        return self.submit(rows).result()
+
+    def _run(self, requests):
+        while True:
+            pending = [requests.get()]
+            size = len(pending[0][0])
+            deadline = time.monotonic() + (self.max_latency if self.avg_requests > 1.1 else 0)
+
+            while size < self.max_batch_size:
+                try:
+                    item = requests.get_nowait()
+                except queue.Empty:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = requests.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                pending.append(item)
+                size += len(item[0])
+
+            self.avg_requests = 0.9 * self.avg_requests + 0.1 * len(pending)
+            self._run_batch(pending)
+
+    def _run_batch(self, pending):
+        # Requests with different feature counts cannot share an array
+        groups = {}
+        for rows, future in pending:
+            groups.setdefault(rows.shape[1:], []).append((rows, future))
+
+        for group in groups.values():
+            try:
+                batch = group[0][0] if len(group) == 1 else np.concatenate([rows for rows, _ in group])
+                results = self.fn(batch)
+            except Exception as e:
+                if len(group) == 1:
+                    group[0][1].set_exception(e)
+                else:
+                    # One bad request must not fail the others: retry each on its own
+                    for rows, future in group:
+                        self._run_alone(rows, future)
+                continue
+
+            offset = 0
+            for rows, future in group:
+                future.set_result(tuple(r[offset:offset + len(rows)] for r in results))
+                offset += len(rows)
+
+    def _run_alone(self, rows, future):
+        try:
+            future.set_result(self.fn(rows))
+        except Exception as e:
+            future.set_exception(e)
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Prediction Hot-Path Microbenchmarks
+Times each in-process stage of the demo services across batch sizes,
+saves the results as a baseline and fails when a stage gets slower
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+BATCH_SIZES = (1, 10, 100, 1000, 10000, 100000)
+FEATURES = 5
+BASELINE_PATH = os.environ.get('MICROBENCH_BASELINE',
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), 'microbench_baseline.json'))
+
+# name -> factory(rows) returning the zero-argument callable to time
+STAGES = {}
+
+
+class Unavailable(Exception):
+    """A stage that cannot run here, e.g. its service's dependencies are missing"""
+
+
+def stage(name):
+    def register(factory):
+        STAGES[name] = factory
+        return factory
+    return register
+
+
+def sample_rows(count, features=FEATURES, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, features))
+
+
+def json_body(rows, wrap=lambda data: {"data": data}):
+    return json.dumps(wrap(rows.tolist())).encode()
+
+
+# --- flask_ml_service.predict, stage by stage and end to end ---
+
+_flask = None
+
+
+def flask_service():
+    global _flask
+    if _flask is None:
+        try:
+            import flask_ml_service
+        except (ImportError, FileNotFoundError) as e:
+            raise Unavailable(f"flask_ml_service: {e}")
+        _flask = flask_ml_service
+    return _flask
+
+
+@stage('flask.decode')
+def flask_decode(rows):
+    from payload_formats import decode_request
+    body = json_body(rows)
+    return lambda: decode_request('application/json', body)
+
+
+@stage('flask.predict')
+def flask_predict(rows):
+    service = flask_service()
+    return lambda: service.run_model(rows)
+
+
+@stage('flask.predict_proba.sklearn')
+def flask_predict_proba_sklearn(rows):
+    model = flask_service().model
+    return lambda: model.predict_proba(rows)
+
+
+@stage('flask.predict_proba.flat')
+def flask_predict_proba_flat(rows):
+    from flat_forest import FlatForest
+    service = flask_service()
+    forest = service.artifact.get('flat_forest') or FlatForest.from_sklearn(service.model)
+    return lambda: forest.predict_proba(rows)
+
+
+@stage('flask.encode')
+def flask_encode(rows):
+    service = flask_service()
+    prediction, probability = service.run_model(rows)
+
+    def encode():
+        with service.app.app_context():
+            return service.jsonify({
+                "prediction": prediction.tolist(),
+                "input_shape": rows.shape,
+                "model": "random_forest_demo",
+                "probability": probability.tolist()
+            }).get_data()
+    return encode
+
+
+@stage('flask.request')
+def flask_request(rows):
+    """Whole /predict request through the WSGI app, cache bypassed"""
+    service = flask_service()
+    client = service.app.test_client()
+    body = json_body(rows)
+    service.prediction_cache.max_entries = 0
+
+    def request():
+        response = client.post('/predict', data=body, content_type='application/json')
+        if response.status_code != 200:
+            raise RuntimeError(f"/predict answered {response.status_code}: {response.get_data()[:200]}")
+    return request
+
+
+# --- ml_service.MLService.predict and demo_bentoml_service.DemoMLService.predict ---
+
+def bentoml_method(module_name, class_name, method_name):
+    """The plain function behind a BentoML API method"""
+    try:
+        service = getattr(__import__(module_name), class_name)
+        method = getattr(getattr(service, 'inner', service), method_name)
+    except Exception as e:  # bentoml missing, or a service definition it rejects
+        raise Unavailable(f"{module_name}: {str(e).splitlines()[0]}")
+    return getattr(method, 'func', method)
+
+
+@stage('ml_service.predict')
+def ml_service_predict(rows):
+    from prediction_cache import PredictionCache
+    predict = bentoml_method('ml_service', 'MLService', 'predict')
+    service = type('Service', (), {})()
+    service.cache = PredictionCache(max_entries=0)
+    return lambda: predict(service, rows)
+
+
+@stage('ml_service.predict_batch')
+def ml_service_predict_batch(rows):
+    predict_batch = bentoml_method('ml_service', 'MLService', 'predict_batch')
+    return lambda: predict_batch(None, rows)
+
+
+@stage('demo_bentoml_service.predict')
+def demo_bentoml_predict(rows):
+    predict = bentoml_method('demo_bentoml_service', 'DemoMLService', 'predict')
+    document = {"data": rows.tolist()}
+    return lambda: predict(None, document)
+
+
+# --- demo_service.DemoHandler.do_POST, without a socket ---
+
+@stage('demo_service.do_POST')
+def demo_service_post(rows):
+    import demo_service
+    from demo_service import DemoHandler
+    body = json_body(rows)
+    # Large batches exceed the default request size limit
+    demo_service.MAX_BODY_BYTES = max(demo_service.MAX_BODY_BYTES, len(body))
+
+    def post():
+        handler = DemoHandler.__new__(DemoHandler)
+        handler.rfile = io.BytesIO(body)
+        handler.wfile = io.BytesIO()
+        handler.headers = {'Content-Length': str(len(body))}
+        handler.path = '/predict'
+        handler.command = 'POST'
+        handler.request_version = 'HTTP/1.1'
+        handler.requestline = 'POST /predict HTTP/1.1'
+        handler.client_address = ('127.0.0.1', 0)
+        handler.close_connection = False
+        handler.do_POST()
+        return handler.wfile.getvalue()
+    return post
+
+
+def measure(fn, min_time=0.2, min_repeats=5, max_repeats=1000):
+    """Median seconds per call, repeating until min_time has been spent"""
+    fn()  # warm caches and lazy imports
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < max_repeats and (len(timings) < min_repeats or time.perf_counter() - started < min_time):
+        t = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t)
+    return statistics.median(timings), len(timings)
+
+
+def run(names, batch_sizes, min_time, max_rows):
+    """{'stage[rows]': seconds per call}, printing a line per measurement"""
+    results = {}
+    for name in names:
+        for count in batch_sizes:
+            if count > max_rows:
+                continue
+            key = f"{name}[{count}]"
+            try:
+                fn = STAGES[name](sample_rows(count))
+            except Unavailable as e:
+                print(f"  {key:<40} skipped ({e})")
+                break
+            seconds, repeats = measure(fn, min_time=min_time)
+            results[key] = seconds
+            print(f"  {key:<40} {seconds * 1e3:12.4f} ms  {count / seconds:14,.0f} rows/s  ({repeats} runs)")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Keys whose time grew by more than threshold (a fraction) over the baseline"""
+    regressions = []
+    for key, seconds in results.items():
+        before = baseline.get(key)
+        if before and seconds > before * (1 + threshold):
+            regressions.append((key, before, seconds))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark the prediction hot paths")
+    parser.add_argument('-k', '--filter', default='', help="Only stages whose name contains this")
+    parser.add_argument('--batch-sizes', type=lambda s: [int(n) for n in s.split(',')], default=list(BATCH_SIZES),
+                        help="Comma-separated rows per call (default 1,10,...,100000)")
+    parser.add_argument('--max-rows', type=int, default=max(BATCH_SIZES))
+    parser.add_argument('--min-time', type=float, default=0.2, help="Seconds spent per measurement (default 0.2)")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline results file")
+    parser.add_argument('--save', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Fail when a stage is this much slower than the baseline (default 0.25 = 25%%)")
+    parser.add_argument('--list', action='store_true', help="List stages and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        print('\n'.join(STAGES))
+        return 0
+
+    names = [name for name in STAGES if args.filter in name]
+    print(f"Timing {len(names)} stages at batch sizes {', '.join(map(str, args.batch_sizes))}")
+    results = run(names, args.batch_sizes, args.min_time, args.max_rows)
+
+    if args.save:
+        stored = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                stored = json.load(f)['results']
+        stored.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'numpy': np.__version__,
+                       'saved_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'results': stored}, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save to create one")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.threshold)
+    for key, before, after in regressions:
+        print(f"REGRESSION {key}: {before * 1e3:.4f} ms -> {after * 1e3:.4f} ms (+{(after / before - 1) * 100:.0f}%)")
+    if regressions:
+        print(f"{len(regressions)} stages slower than baseline by more than {args.threshold:.0%}")
+        return 1
+    print(f"No stage slower than baseline by more than {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Model Artifacts
+Versioned on-disk models shared by the ML services; written once by
+create_demo_model.py and loaded at startup, plain numpy arrays memory-mapped
+"""
+import os
+import time
+
+import joblib
+
+MODEL_NAME = 'random_forest_demo'
+MODEL_VERSION = os.environ.get('MODEL_VERSION', '1')
+MODEL_DIR = os.environ.get('MODEL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+
+
+def model_path(name=MODEL_NAME, version=MODEL_VERSION, model_dir=MODEL_DIR):
+    """Path of a versioned artifact, e.g. models/random_forest_demo-v1.joblib"""
+    return os.path.join(model_dir, f"{name}-v{version}.joblib")
+
+
+def save_model(model, path, **metadata):
+    """Write a model with its metadata; uncompressed so its plain arrays can be memory-mapped"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write then rename so a running service never sees a half-written file
+    tmp_path = path + '.tmp'
+    joblib.dump(dict(metadata, model=model, saved_at=time.time()), tmp_path, compress=0)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_model(path):
+    """Load an artifact, memory-mapping its plain numpy arrays read-only.
+
+    Only arrays stored as such (the flat_forest arrays) stay mapped and are
+    shared through the page cache. scikit-learn's Tree.__setstate__ copies
+    its node arrays onto the heap, so the sklearn model, used for batches
+    over FLAT_FOREST_MAX_ROWS, is private to each process that loads it and
+    shared between gunicorn workers only copy-on-write after preload_app.
+
+    Returns the artifact dict (model, version, ...) plus load_seconds.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Model artifact {path} not found; run `python create_demo_model.py` first")
+    started = time.perf_counter()
+    artifact = joblib.load(path, mmap_mode='r')
+    artifact['load_seconds'] = time.perf_counter() - started
+    return artifact
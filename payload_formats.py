@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Prediction Payload Formats
+Decodes request bodies straight into ndarrays and encodes results, for
+JSON, NumPy .npy, Arrow IPC streams and msgpack
+"""
+import io
+import json
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # optional format
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional format
+    pa = None
+
+JSON = 'application/json'
+NPY = 'application/x-npy'
+ARROW = 'application/vnd.apache.arrow.stream'
+MSGPACK = 'application/msgpack'
+
+MEDIA_TYPES = [JSON, NPY, ARROW, MSGPACK]
+ALIASES = {'application/x-msgpack': MSGPACK, 'application/octet-stream': NPY}
+
+
+class PayloadError(Exception):
+    """Bad or unsupported payload; status is the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def media_type(content_type):
+    """Normalize a Content-Type header, e.g. 'application/json; charset=utf-8' -> JSON"""
+    base = (content_type or JSON).split(';')[0].strip().lower()
+    return ALIASES.get(base, base)
+
+
+def available_media_types():
+    """Formats this process can decode and encode"""
+    return [t for t in MEDIA_TYPES
+            if not (t == ARROW and pa is None) and not (t == MSGPACK and msgpack is None)]
+
+
+def to_array(value):
+    """np.array of decoded input; ragged or mixed nesting is a bad request"""
+    try:
+        return np.array(value)
+    except (TypeError, ValueError) as e:
+        raise PayloadError(f"Input must be a rectangular array of numbers: {e}")
+
+
+def as_rows(array):
+    """Validate a numeric input array and shape it as (rows, features)"""
+    if array.dtype.kind not in 'biuf':
+        try:
+            array = array.astype(np.float64)
+        except (TypeError, ValueError):
+            raise PayloadError("Input must be numeric")
+    if array.ndim == 1:
+        array = array.reshape(1, -1)
+    if array.ndim != 2 or array.size == 0:
+        raise PayloadError(f"Expected a non-empty 1D or 2D array, got shape {array.shape}")
+    return array
+
+
+def decode_npy(body):
+    """Read a .npy body without copying: the array views the request bytes"""
+    buffer = io.BytesIO(body)
+    try:
+        version = np.lib.format.read_magic(buffer)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(buffer)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(buffer)
+    except ValueError as e:
+        raise PayloadError(f"Invalid .npy payload: {e}")
+    if dtype.hasobject:
+        raise PayloadError("Object arrays are not accepted")
+
+    count = int(np.prod(shape))
+    if len(body) - buffer.tell() < count * dtype.itemsize:
+        raise PayloadError("Truncated .npy payload")
+    array = np.frombuffer(body, dtype=dtype, count=count, offset=buffer.tell())
+    return array.reshape(shape, order='F' if fortran_order else 'C')
+
+
+def read_arrow(body):
+    """Parse an Arrow IPC stream into a table"""
+    if pa is None:
+        raise PayloadError("Arrow payloads need pyarrow installed", status=415)
+    try:
+        table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    except pa.ArrowInvalid as e:
+        raise PayloadError(f"Invalid Arrow payload: {e}")
+    if table.num_columns == 0:
+        raise PayloadError("Arrow payload has no columns")
+    return table
+
+
+def arrow_rows(table):
+    """Every numeric column of a table becomes one feature"""
+    rows = np.empty((table.num_rows, table.num_columns), dtype=np.float64)
+    for i, column in enumerate(table.columns):
+        try:
+            rows[:, i] = column.to_numpy(zero_copy_only=False)
+        except (TypeError, ValueError, pa.ArrowException) as e:
+            raise PayloadError(f"Arrow column {table.column_names[i]!r} is not numeric: {e}")
+    return rows
+
+
+def decode_arrow(body):
+    """Read an Arrow IPC stream; every numeric column becomes one feature"""
+    return arrow_rows(read_arrow(body))
+
+
+def unpack_ndarray(value):
+    """msgpack arrays may be nested lists or {'dtype', 'shape', 'data': bytes}"""
+    if isinstance(value, dict) and isinstance(value.get('data'), bytes):
+        try:
+            dtype = np.dtype(value['dtype'])
+        except KeyError:
+            raise PayloadError("msgpack array has no dtype")
+        except (TypeError, ValueError) as e:
+            raise PayloadError(f"Invalid msgpack array dtype: {e}")
+        if dtype.hasobject:
+            raise PayloadError("Object arrays are not accepted")
+        try:
+            return np.frombuffer(value['data'], dtype=dtype).reshape(value['shape'])
+        except KeyError:
+            raise PayloadError("msgpack array has no shape")
+        except (TypeError, ValueError) as e:
+            raise PayloadError(f"Invalid msgpack array: {e}")
+    return to_array(value)
+
+
+def decode_request(content_type, body, timer=None):
+    """Decode a /predict body into (rows, options); options holds any other fields.
+
+    A StageTimer, if given, is marked once the body is parsed ('parse') and
+    once the ndarray is built ('array').
+    """
+    kind = media_type(content_type)
+    options = {}
+    if kind == JSON:
+        try:
+            document = json.loads(body)
+        except ValueError as e:
+            raise PayloadError(f"Invalid JSON: {e}")
+        if not isinstance(document, dict) or 'data' not in document:
+            raise PayloadError("No data provided")
+        payload, options = document.pop('data'), document
+    elif kind == NPY:
+        payload = body
+    elif kind == ARROW:
+        payload = read_arrow(body)
+    elif kind == MSGPACK:
+        if msgpack is None:
+            raise PayloadError("msgpack payloads need msgpack installed", status=415)
+        try:
+            document = msgpack.unpackb(body, raw=False)
+        except (ValueError, msgpack.UnpackException) as e:
+            raise PayloadError(f"Invalid msgpack: {e}")
+        if not isinstance(document, dict) or 'data' not in document:
+            raise PayloadError("No data provided")
+        payload, options = document.pop('data'), document
+    else:
+        raise PayloadError(f"Unsupported Content-Type {content_type}", status=415)
+    if timer is not None:
+        timer.mark('parse')
+
+    if kind == NPY:
+        rows = as_rows(decode_npy(payload))
+    elif kind == ARROW:
+        rows = as_rows(arrow_rows(payload))
+    elif kind == MSGPACK:
+        rows = as_rows(unpack_ndarray(payload))
+    else:
+        rows = as_rows(to_array(payload))
+    if timer is not None:
+        timer.mark('array')
+    return rows, options
+
+
+def encode_response(kind, prediction, probability=None, metadata=None):
+    """Encode results as (body, content type); metadata only fits JSON and msgpack"""
+    metadata = metadata or {}
+    if kind == NPY:
+        # One structured array, so labels and probabilities travel together without pickle
+        fields = [('prediction', prediction.dtype)]
+        if probability is not None:
+            fields.append(('probability', probability.dtype, probability.shape[1:]))
+        records = np.empty(len(prediction), dtype=fields)
+        records['prediction'] = prediction
+        if probability is not None:
+            records['probability'] = probability
+        buffer = io.BytesIO()
+        np.save(buffer, records, allow_pickle=False)
+        return buffer.getvalue(), NPY
+
+    if kind == ARROW:
+        columns = {'prediction': pa.array(prediction)}
+        if probability is not None:
+            for i in range(probability.shape[1]):
+                columns[f"probability_{i}"] = pa.array(probability[:, i])
+        table = pa.table(columns)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes(), ARROW
+
+    if kind == MSGPACK:
+        document = dict(metadata, prediction=pack_ndarray(prediction))
+        if probability is not None:
+            document['probability'] = pack_ndarray(probability)
+        return msgpack.packb(document, use_bin_type=True), MSGPACK
+
+    document = dict(metadata, prediction=prediction.tolist())
+    if probability is not None:
+        document['probability'] = probability.tolist()
+    return json.dumps(document).encode(), JSON
+
+
+def pack_ndarray(array):
+    array = np.ascontiguousarray(array)
+    return {'dtype': array.dtype.str, 'shape': list(array.shape), 'data': array.tobytes()}
+
+
+def parse_flag(value, default=True):
+    """Read a boolean option from JSON (bool) or a query string ('false', '0', ...)"""
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() not in ('false', '0', 'no', 'off', '')
+    return bool(value)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Prediction Result Cache
+In-process LRU with TTL in front of model inference, with an optional
+shared Redis tier; keyed on model version plus the canonical input bytes
+"""
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import redis
+except ImportError:  # the Redis tier is optional
+    redis = None
+
+# After a Redis error, stay local-only for this long
+REDIS_RETRY_SECONDS = 30
+
+
+def cache_key(model_version, rows):
+    """Hash of the model version and the input's shape and float64 bytes, whatever its dtype"""
+    rows = np.ascontiguousarray(rows, dtype=np.float64)
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(str(model_version).encode())
+    digest.update(str(rows.shape).encode())
+    digest.update(rows.tobytes())
+    return digest.hexdigest()
+
+
+def pack_arrays(arrays):
+    """Serialize a tuple of arrays without pickle, so cached bytes are safe to load"""
+    buffer = io.BytesIO()
+    np.savez(buffer, *arrays)
+    return buffer.getvalue()
+
+
+def unpack_arrays(data):
+    with np.load(io.BytesIO(data), allow_pickle=False) as archive:
+        return tuple(archive[f"arr_{i}"] for i in range(len(archive.files)))
+
+
+class PredictionCache:
+    """Thread-safe LRU/TTL cache of prediction arrays, optionally backed by Redis.
+
+    Values are tuples of arrays. Counters are per process and reported by
+    stats().
+    """
+
+    def __init__(self, max_entries=10000, ttl=300, redis_url=None, namespace='prediction'):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.namespace = namespace
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.counters = {'hits': 0, 'misses': 0, 'redis_hits': 0, 'evictions': 0, 'redis_errors': 0}
+
+        self.redis = None
+        self.redis_retry_at = 0
+        if redis_url and redis is not None:
+            self.redis = redis.Redis.from_url(redis_url, socket_timeout=0.05, socket_connect_timeout=0.2)
+        elif redis_url:
+            print("Redis cache tier disabled: the redis package is not installed")
+
+    @classmethod
+    def from_env(cls, namespace='prediction'):
+        """Configure from PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL and REDIS_URL"""
+        return cls(max_entries=int(os.environ.get('PREDICTION_CACHE_SIZE', 10000)),
+                   ttl=float(os.environ.get('PREDICTION_CACHE_TTL', 300)),
+                   redis_url=os.environ.get('REDIS_URL') or None,
+                   namespace=namespace)
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def _redis_available(self):
+        return self.redis is not None and time.monotonic() >= self.redis_retry_at
+
+    def _redis_failed(self, e):
+        with self.lock:
+            self.counters['redis_errors'] += 1
+        self.redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+        print(f"Redis cache tier unavailable for {REDIS_RETRY_SECONDS}s: {e}")
+
+    def get(self, key):
+        """Cached arrays for key, or None"""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > now:
+                self.entries.move_to_end(key)
+                self.counters['hits'] += 1
+                return entry[1]
+            if entry:
+                del self.entries[key]
+
+        if self._redis_available():
+            try:
+                data = self.redis.get(f"{self.namespace}:{key}")
+            except redis.RedisError as e:
+                self._redis_failed(e)
+                data = None
+            if data is not None:
+                value = unpack_arrays(data)
+                self._store(key, value)
+                with self.lock:
+                    self.counters['hits'] += 1
+                    self.counters['redis_hits'] += 1
+                return value
+
+        with self.lock:
+            self.counters['misses'] += 1
+        return None
+
+    def _store(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.counters['evictions'] += 1
+
+    def set(self, key, value):
+        """Cache a tuple of arrays locally and in Redis"""
+        for array in value:
+            array.setflags(write=False)  # shared between requests from now on
+        self._store(key, value)
+
+        if self._redis_available():
+            try:
+                self.redis.set(f"{self.namespace}:{key}", pack_arrays(value), ex=max(1, int(self.ttl)))
+            except redis.RedisError as e:
+                self._redis_failed(e)
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self.lock:
+            stats = dict(self.counters, size=len(self.entries), max_entries=self.max_entries,
+                         ttl=self.ttl, redis=self.redis is not None)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Container Resource Telemetry
+Streams CPU, memory, network and block I/O samples for every running container
+over one multiplexed worker and keeps a short history per container
+"""
+import json
+import os
+import selectors
+import socket
+import subprocess
+import threading
+import time
+from urllib.parse import quote
+
+import numpy as np
+
+from docker_engine import DockerEngineError
+from docker_state import ENGINE_ERRORS, PS_FORMAT, get_engine
+
+# Columns of the per-container ring buffer; network and block I/O are cumulative byte counters
+FIELDS = ('ts', 'cpu_percent', 'mem_usage', 'mem_limit', 'net_rx', 'net_tx', 'blk_read', 'blk_write')
+HISTORY_SAMPLES = 120  # two minutes at the daemon's one sample per second
+
+# Do not hammer the daemon with reconnects for a container whose stream failed
+RECONNECT_DELAY = 5.0
+# Engine API answers meaning stats requests will never work there (API version
+# refused, socket proxy denying the endpoint); `docker stats` is used instead
+REJECTED_STATUSES = (400, 403, 405, 501)
+
+UNITS = {
+    'b': 1, 'kb': 1e3, 'mb': 1e6, 'gb': 1e9, 'tb': 1e12,
+    'kib': 1024, 'mib': 1024 ** 2, 'gib': 1024 ** 3, 'tib': 1024 ** 4
+}
+
+
+def format_bytes(value):
+    """Render a byte count the way `docker stats` does, e.g. '12.5MiB'"""
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if abs(value) < 1024:
+            return f"{value:.0f}{unit}" if unit == 'B' else f"{value:.1f}{unit}"
+        value /= 1024
+    return f"{value:.1f}TiB"
+
+
+def parse_size(text):
+    """Parse a `docker stats` size such as '1.5MiB' or '648B' into bytes"""
+    text = text.strip()
+    number = text.rstrip('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ')
+    try:
+        return float(number) * UNITS.get(text[len(number):].lower(), 1)
+    except ValueError:
+        return 0.0
+
+
+def parse_pair(text):
+    """Parse an 'a / b' size pair from `docker stats`"""
+    first, _, second = (text or '').partition('/')
+    return parse_size(first), parse_size(second)
+
+
+def sample_from_api(stats, ts=None):
+    """Build a sample tuple (in FIELDS order) from one `/containers/{id}/stats` object"""
+    cpu = stats.get('cpu_stats') or {}
+    precpu = stats.get('precpu_stats') or {}
+    cpu_usage = cpu.get('cpu_usage') or {}
+    cpu_delta = cpu_usage.get('total_usage', 0) - (precpu.get('cpu_usage') or {}).get('total_usage', 0)
+    system_delta = cpu.get('system_cpu_usage', 0) - precpu.get('system_cpu_usage', 0)
+    online_cpus = cpu.get('online_cpus') or len(cpu_usage.get('percpu_usage') or []) or 1
+    cpu_percent = cpu_delta / system_delta * online_cpus * 100 if system_delta > 0 and cpu_delta > 0 else 0.0
+
+    # Same as the CLI: page cache that can be reclaimed does not count as used
+    memory = stats.get('memory_stats') or {}
+    memory_detail = memory.get('stats') or {}
+    inactive = memory_detail.get('total_inactive_file', memory_detail.get('inactive_file', 0))
+    mem_usage = memory.get('usage', 0)
+    if inactive < mem_usage:
+        mem_usage -= inactive
+
+    networks = (stats.get('networks') or {}).values()
+    net_rx = sum(n.get('rx_bytes', 0) for n in networks)
+    net_tx = sum(n.get('tx_bytes', 0) for n in networks)
+
+    blk_read = blk_write = 0
+    for entry in (stats.get('blkio_stats') or {}).get('io_service_bytes_recursive') or []:
+        op = entry.get('op', '').lower()
+        if op == 'read':
+            blk_read += entry.get('value', 0)
+        elif op == 'write':
+            blk_write += entry.get('value', 0)
+
+    return (ts or time.time(), cpu_percent, mem_usage, memory.get('limit', 0),
+            net_rx, net_tx, blk_read, blk_write)
+
+
+def sample_from_cli(entry, ts=None):
+    """Build a sample tuple from one `docker stats --format '{{json .}}'` object"""
+    try:
+        cpu_percent = float(entry.get('CPUPerc', '0').rstrip('%') or 0)
+    except ValueError:
+        cpu_percent = 0.0
+    mem_usage, mem_limit = parse_pair(entry.get('MemUsage'))
+    net_rx, net_tx = parse_pair(entry.get('NetIO'))
+    blk_read, blk_write = parse_pair(entry.get('BlockIO'))
+    return (ts or time.time(), cpu_percent, mem_usage, mem_limit, net_rx, net_tx, blk_read, blk_write)
+
+
+class ResourceHistory:
+    """Fixed-size columnar ring buffer of samples for one container"""
+
+    def __init__(self, capacity=HISTORY_SAMPLES):
+        self.data = np.zeros((len(FIELDS), capacity))
+        self.capacity = capacity
+        self.next = 0
+        self.count = 0
+
+    def append(self, sample):
+        self.data[:, self.next] = sample
+        self.next = (self.next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def series(self, field):
+        """Values of one field, oldest first"""
+        row = self.data[FIELDS.index(field)]
+        if self.count < self.capacity:
+            return row[:self.count].copy()
+        return np.concatenate((row[self.next:], row[:self.next]))
+
+    def rate(self, field):
+        """Per-second rate of a cumulative counter; counter resets read as 0"""
+        values = self.series(field)
+        if len(values) < 2:
+            return np.zeros(0)
+        elapsed = np.maximum(np.diff(self.series('ts')), 1e-3)
+        return np.maximum(np.diff(values), 0) / elapsed
+
+    def latest(self):
+        """Most recent sample as a dict, or None if empty"""
+        if not self.count:
+            return None
+        return dict(zip(FIELDS, self.data[:, self.next - 1].tolist()))
+
+
+class ResourceStatsStore:
+    """Thread-safe histories for all containers, keyed by container ID.
+
+    The resource monitor thread is the only writer; `version` increases on
+    every sample so views can skip redundant repaints.
+    """
+
+    def __init__(self, capacity=HISTORY_SAMPLES):
+        self._lock = threading.Lock()
+        self._histories = {}
+        self.capacity = capacity
+        self.version = 0
+
+    def add(self, container_id, sample):
+        with self._lock:
+            history = self._histories.get(container_id)
+            if history is None:
+                history = self._histories[container_id] = ResourceHistory(self.capacity)
+            history.append(sample)
+            self.version += 1
+
+    def retain(self, container_ids):
+        """Drop histories of containers that no longer exist"""
+        with self._lock:
+            for container_id in [c for c in self._histories if c not in container_ids]:
+                del self._histories[container_id]
+
+    def series(self, container_id, field, rate=False):
+        """Copy of one field's history (or its per-second rate), oldest first"""
+        with self._lock:
+            history = self._histories.get(container_id)
+            if history is None:
+                return np.zeros(0)
+            return history.rate(field) if rate else history.series(field)
+
+    def latest(self, container_id):
+        with self._lock:
+            history = self._histories.get(container_id)
+            return history.latest() if history else None
+
+
+class StatsConnection:
+    """One non-blocking `/stats?stream=1` response being parsed line by line"""
+
+    def __init__(self, container_id, sock):
+        self.container_id = container_id
+        self.sock = sock
+        self.buffer = b''
+        self.headers_done = False
+
+    def feed(self, data):
+        """Add received bytes; returns the complete stats objects they finish"""
+        self.buffer += data
+        if not self.headers_done:
+            head, sep, rest = self.buffer.partition(b'\r\n\r\n')
+            if not sep:
+                return []
+            status_line = head.split(b'\r\n', 1)[0].decode('latin-1')
+            parts = status_line.split(' ', 2)
+            status = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+            if status != 200:
+                raise DockerEngineError(status, rest.decode('utf-8', 'replace').strip())
+            self.headers_done = True
+            self.buffer = rest
+
+        *lines, self.buffer = self.buffer.split(b'\n')
+        return [json.loads(line) for line in lines if line.strip()]
+
+
+class EngineStatsRejected(DockerEngineError):
+    """The daemon refuses `/stats` requests; open_stats_stream() uses the CLI from now on"""
+
+
+def reject_engine(error):
+    """Stop using the Engine API for stats; returns the exception to raise"""
+    global _engine_rejected
+    _engine_rejected = True
+    return EngineStatsRejected(error.status, error.message)
+
+
+class EngineStatsMultiplexer:
+    """Follows `/containers/{id}/stats?stream=1` for many containers from one thread.
+
+    Each container gets its own socket (the daemon streams one response per
+    request); a selector waits on all of them at once. Requests are sent as
+    HTTP/1.0 so the daemon streams plain newline-delimited JSON without
+    chunked framing.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.selector = selectors.DefaultSelector()
+        self.connections = {}
+        self.failed = {}
+
+    def _open(self, container_id):
+        try:
+            path = self.engine.url(f"/containers/{quote(container_id, safe='')}/stats", {'stream': '1'})
+        except DockerEngineError as e:
+            raise reject_engine(e) if e.status in REJECTED_STATUSES else e
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(2)
+            sock.connect(self.engine.socket_path)
+            sock.sendall(f"GET {path} HTTP/1.0\r\nHost: localhost\r\n\r\n".encode('ascii'))
+            sock.setblocking(False)
+        except OSError:
+            sock.close()
+            raise
+        connection = StatsConnection(container_id, sock)
+        self.selector.register(sock, selectors.EVENT_READ, connection)
+        self.connections[container_id] = connection
+
+    def _close(self, container_id):
+        connection = self.connections.pop(container_id, None)
+        if connection:
+            self.selector.unregister(connection.sock)
+            connection.sock.close()
+
+    def track(self, container_ids):
+        """Follow exactly these containers, opening and closing streams as needed"""
+        for container_id in [c for c in self.connections if c not in container_ids]:
+            self._close(container_id)
+        for container_id in [c for c in self.failed if c not in container_ids]:
+            del self.failed[container_id]
+
+        now = time.monotonic()
+        for container_id in container_ids:
+            if container_id in self.connections:
+                continue
+            if now - self.failed.get(container_id, now - RECONNECT_DELAY) < RECONNECT_DELAY:
+                continue
+            try:
+                self._open(container_id)
+            except EngineStatsRejected:
+                raise
+            except ENGINE_ERRORS as e:
+                self.failed[container_id] = now
+                print(f"Stats stream error for {container_id[:12]}: {e}")
+
+    def poll(self, timeout):
+        """Wait up to timeout seconds; returns a list of (container_id, sample)"""
+        if not self.connections:
+            time.sleep(timeout)
+            return []
+
+        samples = []
+        for key, _ in self.selector.select(timeout):
+            connection = key.data
+            try:
+                data = connection.sock.recv(65536)
+            except BlockingIOError:
+                continue
+            except OSError:
+                data = b''
+
+            try:
+                objects = connection.feed(data) if data else None
+            except DockerEngineError as e:
+                if e.status in REJECTED_STATUSES:
+                    raise reject_engine(e)
+                print(f"Stats stream error for {connection.container_id[:12]}: {e}")
+                objects = None
+            except ValueError as e:
+                print(f"Stats stream error for {connection.container_id[:12]}: {e}")
+                objects = None
+
+            if objects is None:
+                # Stream ended (container stopped) or failed; reopen later if still running
+                self.failed[connection.container_id] = time.monotonic()
+                self._close(connection.container_id)
+                continue
+            samples.extend((connection.container_id, sample_from_api(obj)) for obj in objects)
+        return samples
+
+    def close(self):
+        for container_id in list(self.connections):
+            self._close(container_id)
+        self.selector.close()
+
+
+class CliStatsStream:
+    """`docker stats` for all running containers, read without blocking"""
+
+    def __init__(self):
+        self.process = subprocess.Popen(['docker', 'stats', '--no-trunc', '--format', PS_FORMAT],
+                                        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.process.stdout, selectors.EVENT_READ)
+        self.buffer = b''
+
+    def track(self, container_ids):
+        """The CLI follows every running container by itself"""
+
+    def poll(self, timeout):
+        """Wait up to timeout seconds; returns a list of (container_id, sample)"""
+        if not self.selector.select(timeout):
+            return []
+        data = os.read(self.process.stdout.fileno(), 65536)
+        if not data:
+            raise RuntimeError("docker stats exited")
+
+        *lines, self.buffer = (self.buffer + data).split(b'\n')
+        samples = []
+        for line in lines:
+            # Each refresh starts with terminal clear-screen codes
+            start = line.find(b'{')
+            if start < 0:
+                continue
+            entry = json.loads(line[start:])
+            samples.append((entry.get('ID', ''), sample_from_cli(entry)))
+        return samples
+
+    def close(self):
+        self.selector.close()
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+# Set once the daemon rejects Engine API stats requests; later streams use the CLI
+_engine_rejected = False
+
+
+def open_stats_stream():
+    """Follow resource usage of running containers; the result has track(), poll() and close()"""
+    engine = get_engine()
+    if engine and not _engine_rejected:
+        return EngineStatsMultiplexer(engine)
+    return CliStatsStream()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Container to Service Resolver
+One shared mapping from containers to DemoForge services, used by every view
+"""
+import re
+import threading
+
+
+class ServiceResolver:
+    """Resolves containers to (service_id, display name).
+
+    Built once from the service table, name aliases and parsed compose files.
+    Lookup order: compose labels, exact container_name from a compose file,
+    then a single precompiled pattern over all known names. Results are
+    cached per container ID, so each refresh is O(containers).
+    """
+
+    def __init__(self, services, supporting_services, aliases, compose_models):
+        self.display_names = {sid: info['name'] for sid, info in services.items()}
+        self.display_names.update(supporting_services)
+
+        # Every known name, service IDs included, points at a service ID
+        self.names = {sid: sid for sid in self.display_names}
+        self.names.update(aliases)
+
+        # Longest names first so 'postgres_twenty' wins over 'twenty'
+        self.pattern = re.compile('|'.join(
+            re.escape(name) for name in sorted(self.names, key=len, reverse=True)))
+
+        self.lock = threading.Lock()
+        self.cache = {}
+        self.compose_services = {}
+        self.container_names = {}
+        self.load_compose_models(compose_models)
+
+    def load_compose_models(self, compose_models):
+        """Rebuild the compose lookups, e.g. after a compose file changed"""
+        compose_services, container_names = {}, {}
+        for model in compose_models:
+            for compose_service in model.services.values():
+                resolved = self.match_name(compose_service.name)
+                if not resolved and model.project_name in self.display_names:
+                    # e.g. 'server' in docker-compose.twenty.yml belongs to Twenty CRM
+                    sid = model.project_name
+                    resolved = (sid, f"{self.display_names[sid]} ({compose_service.name})")
+                if not resolved:
+                    continue
+                compose_services[(model.file_name, compose_service.name)] = resolved
+                if compose_service.container_name:
+                    container_names[compose_service.container_name] = resolved
+
+        with self.lock:
+            self.compose_services = compose_services
+            self.container_names = container_names
+            self.cache.clear()
+
+    def match_name(self, name):
+        """Resolve a bare name through the precompiled pattern"""
+        match = self.pattern.search(name.lower())
+        if not match:
+            return None
+        sid = self.names[match.group(0)]
+        return sid, self.display_names[sid]
+
+    def resolve(self, container):
+        """Map a Container to (service_id, display name), or (None, None) if unknown"""
+        key = (container.id, container.name)
+        with self.lock:
+            cached = self.cache.get(key)
+        if cached:
+            return cached
+
+        resolved = None
+        if container.compose_service:
+            for compose_file in container.compose_files:
+                resolved = self.compose_services.get((compose_file, container.compose_service))
+                if resolved:
+                    break
+        if not resolved:
+            resolved = self.container_names.get(container.name) or self.match_name(container.name)
+        resolved = resolved or (None, None)
+
+        with self.lock:
+            self.cache[key] = resolved
+        return resolved
+
+    def forget_missing(self, containers):
+        """Drop cache entries for containers that no longer exist"""
+        live = {(c.id, c.name) for c in containers}
+        with self.lock:
+            for key in [k for k in self.cache if k not in live]:
+                del self.cache[key]
+
+    def statuses(self, containers):
+        """Service states for the dashboard: 'running' if any of its containers runs"""
+        status_data = {}
+        for container in containers:
+            sid, _ = self.resolve(container)
+            if sid and status_data.get(sid) != 'running':
+                status_data[sid] = 'running' if container.running else 'stopped'
+        self.forget_missing(containers)
+        return status_data
+
+    def containers_for(self, service_id, containers):
+        """Containers belonging to a service, running ones first"""
+        matches = [c for c in containers if self.resolve(c)[0] == service_id]
+        return sorted(matches, key=lambda c: not c.running)
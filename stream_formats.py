@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Streaming Bulk-Scoring Formats
+Reads CSV, NDJSON or Arrow IPC request bodies chunk by chunk and encodes
+results in the same format, so memory stays bounded by the chunk size
+"""
+import io
+import json
+
+import numpy as np
+
+from payload_formats import ARROW, PayloadError, as_rows, media_type, pa, to_array
+
+CSV = 'text/csv'
+NDJSON = 'application/x-ndjson'
+
+STREAM_MEDIA_TYPES = [CSV, NDJSON, ARROW]
+READ_BLOCK_SIZE = 64 * 1024
+
+
+def available_stream_media_types():
+    """Streaming formats this process can read and write"""
+    return [t for t in STREAM_MEDIA_TYPES if not (t == ARROW and pa is None)]
+
+
+def iter_lines(stream, block_size=READ_BLOCK_SIZE):
+    """Lines of a binary stream, read in fixed-size blocks"""
+    pending = b''
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        *lines, pending = (pending + block).split(b'\n')
+        yield from lines
+    if pending:
+        yield pending
+
+
+def parse_csv_rows(lines):
+    try:
+        return np.loadtxt([line.decode() for line in lines], delimiter=',', ndmin=2, dtype=np.float64)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise PayloadError(f"Invalid CSV row: {e}")
+
+
+def iter_csv_chunks(stream, chunk_rows):
+    """Numeric CSV rows in blocks of chunk_rows; a non-numeric first line is a header"""
+    rows = []
+    first = True
+    for line in iter_lines(stream):
+        line = line.strip()
+        if not line:
+            continue
+        if first:
+            first = False
+            try:
+                float(line.split(b',', 1)[0])
+            except ValueError:
+                continue
+        rows.append(line)
+        if len(rows) >= chunk_rows:
+            yield parse_csv_rows(rows)
+            rows = []
+    if rows:
+        yield parse_csv_rows(rows)
+
+
+def iter_ndjson_chunks(stream, chunk_rows):
+    """NDJSON rows (a number array, or an object with 'data') in blocks of chunk_rows"""
+    rows = []
+    for line in iter_lines(stream):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            raise PayloadError(f"Invalid NDJSON line: {e}")
+        rows.append(row['data'] if isinstance(row, dict) and 'data' in row else row)
+        if len(rows) >= chunk_rows:
+            yield as_rows(to_array(rows))
+            rows = []
+    if rows:
+        yield as_rows(to_array(rows))
+
+
+def iter_arrow_chunks(stream, chunk_rows):
+    """Arrow IPC record batches as row blocks of at most chunk_rows"""
+    if pa is None:
+        raise PayloadError("Arrow payloads need pyarrow installed", status=415)
+    try:
+        reader = pa.ipc.open_stream(pa.PythonFile(stream, mode='r'))
+        for batch in reader:
+            for start in range(0, batch.num_rows, chunk_rows):
+                part = batch.slice(start, chunk_rows)
+                rows = np.empty((part.num_rows, part.num_columns), dtype=np.float64)
+                for i, column in enumerate(part.columns):
+                    try:
+                        rows[:, i] = column.to_numpy(zero_copy_only=False)
+                    except (TypeError, ValueError, pa.ArrowException) as e:
+                        raise PayloadError(f"Arrow column {part.column_names[i]!r} is not numeric: {e}")
+                yield rows
+    except pa.ArrowInvalid as e:
+        raise PayloadError(f"Invalid Arrow stream: {e}")
+
+
+def iter_row_chunks(content_type, stream, chunk_rows):
+    """Row blocks from a streamed request body of the given Content-Type"""
+    kind = media_type(content_type)
+    if kind == CSV:
+        return iter_csv_chunks(stream, chunk_rows)
+    if kind == NDJSON:
+        return iter_ndjson_chunks(stream, chunk_rows)
+    if kind == ARROW:
+        return iter_arrow_chunks(stream, chunk_rows)
+    raise PayloadError(f"Unsupported Content-Type {content_type}; use one of {', '.join(STREAM_MEDIA_TYPES)}",
+                       status=415)
+
+
+class ChunkEncoder:
+    """Encodes result blocks of one response, in the request's format"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.started = False
+        self.sink = None
+        self.writer = None
+
+    def encode(self, prediction, probability=None):
+        """Bytes for one block of results"""
+        first, self.started = not self.started, True
+
+        if self.kind == CSV:
+            buffer = io.StringIO()
+            if first:
+                columns = ['prediction'] + ([f"probability_{i}" for i in range(probability.shape[1])]
+                                            if probability is not None else [])
+                buffer.write(','.join(columns) + '\n')
+            values = prediction[:, np.newaxis] if probability is None else np.column_stack([prediction, probability])
+            np.savetxt(buffer, values, delimiter=',', fmt='%.10g')
+            return buffer.getvalue().encode()
+
+        if self.kind == NDJSON:
+            if probability is None:
+                lines = [json.dumps({"prediction": p}) for p in prediction.tolist()]
+            else:
+                lines = [json.dumps({"prediction": p, "probability": q})
+                         for p, q in zip(prediction.tolist(), probability.tolist())]
+            return ('\n'.join(lines) + '\n').encode()
+
+        columns = {'prediction': pa.array(prediction)}
+        if probability is not None:
+            for i in range(probability.shape[1]):
+                columns[f"probability_{i}"] = pa.array(probability[:, i])
+        batch = pa.record_batch(columns)
+        if first:
+            self.sink = io.BytesIO()
+            self.writer = pa.ipc.new_stream(pa.PythonFile(self.sink, mode='w'), batch.schema)
+        self.writer.write_batch(batch)
+        return self._drain()
+
+    def close(self):
+        """Trailing bytes of the response (the Arrow end-of-stream marker)"""
+        if self.writer is None:
+            return b''
+        self.writer.close()
+        return self._drain()
+
+    def _drain(self):
+        data = self.sink.getvalue()
+        self.sink.seek(0)
+        self.sink.truncate()
+        return data
+
+    def error(self, message):
+        """An in-band error record, for failures after the response has started"""
+        if self.kind == NDJSON:
+            return (json.dumps({"error": message}) + '\n').encode()
+        if self.kind == CSV:
+            return f"# error: {message}\n".encode()
+        return b''  # an Arrow stream without its end marker already signals failure
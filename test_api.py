@@ -1,34 +1,48 @@
 #!/usr/bin/env python3
 """
-Test Flask ML API
+Test ML APIs
+Quick smoke test: one health check and one prediction against a service.
+For throughput and latency use benchmark.py.
 """
+import argparse
+
 import requests
-import json
 
-def test_api():
-    print("🧪 Testing Flask ML API...")
+from benchmark import TARGETS
+
+
+def test_api(target_name='flask_ml_service', url=None):
+    target = TARGETS[target_name]
+    url = (url or target['url']).rstrip('/')
+    print(f"🧪 Testing {target_name} at {url}...")
 
-    # Test health endpoint
     try:
-        response = requests.get('http://localhost:5002/health', timeout=10)
+        method, path = target['health']
+        response = requests.request(method, url + path, timeout=10)
         print(f"✅ Health Status: {response.status_code}")
-        print(f"   Response: {response.json()}")
+        print(f"   Response: {response.text[:200]}")
 
         # Test prediction endpoint
-        test_data = {'data': [1, 2, 3, 4, 5]}
-        response = requests.post('http://localhost:5002/predict', json=test_data, timeout=10)
+        test_data = target['body']([[1, 2, 3, 4, 5]])
+        response = requests.post(url + target['path'], json=test_data, timeout=10)
         print(f"✅ Prediction Status: {response.status_code}")
-        print(f"   Response: {response.json()}")
+        print(f"   Response: {response.text[:200]}")
 
-        # Test info endpoint
-        response = requests.get('http://localhost:5002/info', timeout=10)
-        print(f"✅ Info Status: {response.status_code}")
-        print(f"   Response: {response.json()}")
-
-        print("\n🎉 Flask ML API is working perfectly!")
+        if not response.ok:
+            print(f"\n❌ {target_name} prediction failed")
+            return False
+        print(f"\n🎉 {target_name} is working!")
+        print(f"   Measure it with: python benchmark.py {target_name} --url {url}")
+        return True
 
     except Exception as e:
         print(f"❌ API test failed: {e}")
+        return False
+
 
 if __name__ == "__main__":
-    test_api()
+    parser = argparse.ArgumentParser(description="Smoke-test a demo prediction service")
+    parser.add_argument('target', nargs='?', default='flask_ml_service', choices=sorted(TARGETS))
+    parser.add_argument('--url', help="Base URL (default depends on the target)")
+    args = parser.parse_args()
+    raise SystemExit(0 if test_api(args.target, args.url) else 1)